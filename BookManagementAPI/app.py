@@ -5,13 +5,24 @@
 # Now uses SQLite for persistence and includes basic CRUD.
 
 from flask import Flask, request, jsonify, redirect, url_for
+from html import escape
+import base64
+import json
 import os
 import sqlite3
+from urllib.parse import urlencode
 
 app = Flask(__name__)
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "books.db")
 
+# Page sizes for GET /books and /books/html
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Most creates + updates + deletes one POST /books/batch may carry
+MAX_BATCH_SIZE = 5000
+
 def init_db():
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
     with sqlite3.connect(DB_PATH) as conn:
@@ -24,6 +35,9 @@ def init_db():
             )
             """
         )
+        # For the author=/title= prefix filters - pages of those are range scans over these
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_books_author ON books(author COLLATE NOCASE, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_books_title ON books(title COLLATE NOCASE, id)")
 
 def get_db():
     conn = sqlite3.connect(DB_PATH)
@@ -33,10 +47,90 @@ def get_db():
 def row_to_dict(row):
     return {"id": row["id"], "title": row["title"], "author": row["author"]}
 
-@app.route('/')
-def home():
-    # Homepage with a form to add books and a link to view all
-    return '''
+# NOCASE only folds ASCII - 'É' and 'é' stay different, so str.lower() would be wrong here
+ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+def prefix_range(prefix):
+    """[low, high) bounds under NOCASE for strings starting with prefix
+
+    NOCASE folds A-Z to a-z, so the bounds are lowercase, and the character
+    after '@' in that order is '[' (A-Z sort as a-z).
+    """
+    low = prefix.translate(ASCII_LOWER)
+    last = chr(ord(low[-1]) + 1)
+    if 'A' <= last <= 'Z':
+        last = '['
+    return low, low[:-1] + last
+
+def encode_cursor(key, book_id):
+    return base64.urlsafe_b64encode(json.dumps([key, book_id]).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        key, book_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("bad cursor")
+    if not isinstance(key, str) or not isinstance(book_id, int):
+        raise ValueError("bad cursor")
+    return key, book_id
+
+def build_page_query(args):
+    """SQL for one page of books from ?limit=&cursor=&author=&title=
+
+    Without filters it's newest first and cursor is the last id seen. With an
+    author (or title) prefix the page is ordered by that column (ignoring case)
+    and then id, so it's a range scan of idx_books_author/idx_books_title
+    instead of sorting every match; the cursor then carries (value, id) of the
+    last book. Returns (sql, params, limit, order column or None). Raises
+    ValueError for a bad limit/cursor.
+    """
+    limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    prefixes = {column: (args.get(column) or '').strip() for column in ('author', 'title')}
+    # Author wins if both are given; the other is just a filter then
+    order_column = next((column for column in ('author', 'title') if prefixes[column]), None)
+
+    where, params = [], []
+    for column, prefix in prefixes.items():
+        if prefix:
+            where.append(f"{column} COLLATE NOCASE >= ? AND {column} COLLATE NOCASE < ?")
+            params.extend(prefix_range(prefix))
+    if args.get('cursor'):
+        if order_column:
+            where.append(f"({order_column} COLLATE NOCASE, id) > (?, ?)")
+            params.extend(decode_cursor(args['cursor']))
+        else:
+            where.append("id < ?")
+            params.append(int(args['cursor']))
+
+    sql = "SELECT id, title, author FROM books"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {order_column} COLLATE NOCASE, id" if order_column else " ORDER BY id DESC"
+    # One extra row tells us whether there's another page
+    return sql + " LIMIT ?", params + [limit + 1], limit, order_column
+
+def page_of_books(conn, args):
+    """One page of books (see build_page_query), returns (rows, next_cursor)
+
+    next_cursor is None on the last page.
+    """
+    sql, params, limit, order_column = build_page_query(args)
+    rows = conn.execute(sql, params).fetchall()
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(last[order_column], last["id"]) if order_column else last["id"]
+
+# The SQL and HTML live in plain functions taking a connection, so the asyncio
+# server (async_app.py) serves exactly the same thing
+
+PAGE_ERROR = "limit must be a positive whole number and cursor one from a Link header"
+
+HOME_HTML = '''
     <h2>Book Management API</h2>
     <p>This is a personal project to learn Flask and REST API design.</p>
     <form action="/books" method="post">
@@ -47,6 +141,133 @@ def home():
     <a href="/books/html">View Books (HTML)</a>
     '''
 
+def insert_book(conn, title, author):
+    cur = conn.execute("INSERT INTO books(title, author) VALUES(?, ?)", (title.strip(), author.strip()))
+    return {"id": cur.lastrowid, "title": title.strip(), "author": author.strip()}
+
+def find_book(conn, book_id):
+    return conn.execute("SELECT id, title, author FROM books WHERE id=?", (book_id,)).fetchone()
+
+def update_book_row(conn, book_id, title, author):
+    # Blank fields keep their current value; None if there's no such book
+    return conn.execute(
+        "UPDATE books SET title=COALESCE(?, title), author=COALESCE(?, author) WHERE id=? "
+        "RETURNING id, title, author", (title or None, author or None, book_id)).fetchone()
+
+def delete_book_row(conn, book_id):
+    return conn.execute("DELETE FROM books WHERE id=? RETURNING id", (book_id,)).fetchone() is not None
+
+def books_html(rows, older_url=None):
+    items = ''.join(f"<li>#{r['id']}: {escape(r['title'])} — {escape(r['author'])}</li>" for r in rows)
+    older = f"<a href='{escape(older_url)}'>Older</a> | " if older_url else ''
+    return f"""
+    <h3>Books</h3>
+    <ul>{items or '<li>No books yet.</li>'}</ul>
+    {older}<a href='/'>Back</a>
+    """
+
+def next_page_url(path, args, cursor):
+    return path + '?' + urlencode(dict(args, cursor=cursor))
+
+def check_batch_items(items, kind):
+    """Split a batch's items into (valid ones, {index: error})"""
+    valid, errors = [], {}
+    for i, item in enumerate(items):
+        if kind == 'delete':
+            book_id = item.get('id') if isinstance(item, dict) else item
+        elif not isinstance(item, dict):
+            errors[i] = "Each item must be an object"
+            continue
+        else:
+            book_id = item.get('id')
+        if kind != 'create' and (not isinstance(book_id, int) or isinstance(book_id, bool)):
+            errors[i] = "id must be a book id"
+            continue
+        if kind == 'delete':
+            valid.append((i, {"id": book_id}))
+            continue
+        title = item.get('title')
+        author = item.get('author')
+        title = title.strip() if isinstance(title, str) else ''
+        author = author.strip() if isinstance(author, str) else ''
+        if kind == 'create' and (not title or not author):
+            errors[i] = "Title and author are required"
+        elif kind == 'update' and not title and not author:
+            errors[i] = "Nothing to update"
+        else:
+            valid.append((i, {"id": book_id, "title": title or None, "author": author or None}))
+    # The same book twice in one update/delete list would be ambiguous
+    if kind != 'create':
+        seen = set()
+        for i, item in list(valid):
+            if item["id"] in seen:
+                errors[i] = "Book appears more than once in this batch"
+                valid.remove((i, item))
+            seen.add(item["id"])
+    return valid, errors
+
+def plan_batch(data):
+    """Check a /books/batch body, returns (valid items per kind, results so far)
+
+    results has a slot per item, already filled in for the ones that failed
+    their checks. Raises ValueError if the body itself is wrong.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Send a JSON object with create/update/delete lists")
+    lists = {kind: data.get(kind) or [] for kind in ('create', 'update', 'delete')}
+    if not all(isinstance(items, list) for items in lists.values()):
+        raise ValueError("create, update and delete must be lists")
+    if sum(len(items) for items in lists.values()) > MAX_BATCH_SIZE:
+        raise ValueError(f"At most {MAX_BATCH_SIZE} items per batch")
+
+    results = {kind: [None] * len(items) for kind, items in lists.items()}
+    checked = {}
+    for kind, items in lists.items():
+        valid, errors = check_batch_items(items, kind)
+        checked[kind] = valid
+        for i, error in errors.items():
+            results[kind][i] = {"status": 400, "error": error}
+    return checked, results
+
+def write_batch(conn, checked, results):
+    """Run a planned batch - one statement per kind - filling in the rest of results"""
+    if checked['create']:
+        rows = conn.execute(
+            "INSERT INTO books(title, author) "
+            "SELECT json_extract(value, '$.title'), json_extract(value, '$.author') FROM json_each(?) ORDER BY key "
+            "RETURNING id, title, author",
+            (json.dumps([item for _, item in checked['create']]),)).fetchall()
+        # Inserted in list order, so ids go up in list order too
+        for (i, _), row in zip(checked['create'], sorted(rows, key=lambda r: r["id"])):
+            results['create'][i] = {"status": 201, "book": row_to_dict(row)}
+
+    if checked['update']:
+        rows = conn.execute(
+            "UPDATE books SET title=COALESCE(json_extract(u.value, '$.title'), books.title), "
+            "author=COALESCE(json_extract(u.value, '$.author'), books.author) "
+            "FROM json_each(?) AS u WHERE books.id = json_extract(u.value, '$.id') "
+            "RETURNING books.id, books.title, books.author",
+            (json.dumps([item for _, item in checked['update']]),)).fetchall()
+        updated = {row["id"]: row for row in rows}
+        for i, item in checked['update']:
+            row = updated.get(item["id"])
+            results['update'][i] = ({"status": 200, "book": row_to_dict(row)} if row
+                                    else {"status": 404, "error": "Book not found"})
+
+    if checked['delete']:
+        rows = conn.execute(
+            "DELETE FROM books WHERE id IN (SELECT value FROM json_each(?)) RETURNING id",
+            (json.dumps([item["id"] for _, item in checked['delete']]),)).fetchall()
+        deleted = {row["id"] for row in rows}
+        for i, item in checked['delete']:
+            results['delete'][i] = ({"status": 200, "book": {"id": item["id"]}} if item["id"] in deleted
+                                    else {"status": 404, "error": "Book not found"})
+
+@app.route('/')
+def home():
+    # Homepage with a form to add books and a link to view all
+    return HOME_HTML
+
 @app.route('/books', methods=['POST'])
 def add_book():
     # Accept both form and JSON submissions
@@ -56,9 +277,7 @@ def add_book():
         # Return error if missing fields
         return jsonify({'error': 'Title and author are required'}), 400
     with get_db() as conn:
-        cur = conn.execute("INSERT INTO books(title, author) VALUES(?, ?)", (title.strip(), author.strip()))
-        book_id = cur.lastrowid
-        book = {"id": book_id, "title": title.strip(), "author": author.strip()}
+        book = insert_book(conn, title, author)
     # Redirect to HTML list if submitted via form
     if request.form:
         return redirect(url_for('list_books_html'))
@@ -66,27 +285,31 @@ def add_book():
 
 @app.route('/books', methods=['GET'])
 def get_books():
-    # Return all books as JSON
-    with get_db() as conn:
-        rows = conn.execute("SELECT id, title, author FROM books ORDER BY id DESC").fetchall()
-        return jsonify([row_to_dict(r) for r in rows])
+    # Return a page of books as JSON - the next page's URL is in the Link header
+    try:
+        with get_db() as conn:
+            rows, next_cursor = page_of_books(conn, request.args)
+    except ValueError:
+        return jsonify({"error": PAGE_ERROR}), 400
+    response = jsonify([row_to_dict(r) for r in rows])
+    if next_cursor is not None:
+        response.headers['Link'] = f'<{next_page_url(request.path, request.args, next_cursor)}>; rel="next"'
+    return response
 
 @app.route('/books/html')
 def list_books_html():
-    # Show all books in a simple HTML list
-    with get_db() as conn:
-        rows = conn.execute("SELECT id, title, author FROM books ORDER BY id DESC").fetchall()
-        items = ''.join(f"<li>#{r['id']}: {r['title']} — {r['author']}</li>" for r in rows)
-    return f"""
-    <h3>Books</h3>
-    <ul>{items or '<li>No books yet.</li>'}</ul>
-    <a href='/'>Back</a>
-    """
+    # Show a page of books in a simple HTML list
+    try:
+        with get_db() as conn:
+            rows, next_cursor = page_of_books(conn, request.args)
+    except ValueError:
+        return PAGE_ERROR, 400
+    return books_html(rows, next_page_url(request.path, request.args, next_cursor) if next_cursor else None)
 
 @app.route('/books/<int:book_id>', methods=['GET'])
 def get_book(book_id):
     with get_db() as conn:
-        row = conn.execute("SELECT id, title, author FROM books WHERE id=?", (book_id,)).fetchone()
+        row = find_book(conn, book_id)
         if not row:
             return jsonify({"error": "Book not found"}), 404
         return jsonify(row_to_dict(row))
@@ -99,23 +322,37 @@ def update_book(book_id):
     if not title and not author:
         return jsonify({"error": "Nothing to update"}), 400
     with get_db() as conn:
-        row = conn.execute("SELECT id, title, author FROM books WHERE id=?", (book_id,)).fetchone()
+        row = update_book_row(conn, book_id, title, author)
         if not row:
             return jsonify({"error": "Book not found"}), 404
-        new_title = title or row["title"]
-        new_author = author or row["author"]
-        conn.execute("UPDATE books SET title=?, author=? WHERE id=?", (new_title, new_author, book_id))
-        return jsonify({"id": book_id, "title": new_title, "author": new_author})
+        return jsonify(row_to_dict(row))
 
 @app.route('/books/<int:book_id>', methods=['DELETE'])
 def delete_book(book_id):
     with get_db() as conn:
-        row = conn.execute("SELECT id FROM books WHERE id=?", (book_id,)).fetchone()
-        if not row:
+        if not delete_book_row(conn, book_id):
             return jsonify({"error": "Book not found"}), 404
-        conn.execute("DELETE FROM books WHERE id=?", (book_id,))
         return jsonify({"message": "deleted", "id": book_id})
 
+@app.route('/books/batch', methods=['POST'])
+def batch_books():
+    """Create, update and delete many books in one transaction
+
+    Body: {"create": [{"title", "author"}], "update": [{"id", "title"?, "author"?}],
+    "delete": [id or {"id"}]} - any of the three can be left out. They run in
+    that order, each as a single INSERT/UPDATE/DELETE ... RETURNING over the
+    whole list, and everything is committed together. The response has a
+    result per item, in the order they were sent:
+    {"status": 201/200/400/404, "book": {...}} or {"status": ..., "error": ...}.
+    """
+    try:
+        checked, results = plan_batch(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    with get_db() as conn:
+        write_batch(conn, checked, results)
+    return jsonify(results)
+
 if __name__ == '__main__':
     # Run the app in debug mode for development
     init_db()
@@ -0,0 +1,187 @@
+# Book Management API - asyncio serving mode
+# Same routes and JSON as app.py, served by aiohttp on one event loop.
+#
+# The Flask app holds a thread for every request while it waits on SQLite, so
+# lots of concurrent clients means lots of threads. Here the event loop takes
+# all the connections and hands the database work to a few worker threads,
+# each with its own long-lived SQLite connection. The SQL and HTML are the
+# functions app.py uses, so the two modes can't drift apart.
+#
+# Usage:
+#   python async_app.py
+#   python async_app.py --port 5001 --db-workers 4
+
+import argparse
+import asyncio
+import json
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from aiohttp import web
+
+import app as sync_app
+
+
+class DatabaseWorkers:
+    """A few threads with a SQLite connection each - `await run(fn, *args)`
+    runs fn(conn, *args) on one of them as a single transaction"""
+
+    def __init__(self, path, workers=4):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='books-db')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # check_same_thread=False only so close() can close them all from the loop thread
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            # WAL so one worker writing doesn't stop the others reading
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _call(self, fn, args):
+        conn = self._connection()
+        with conn:  # commits, or rolls back if fn raised
+            return fn(conn, *args)
+
+    async def run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._call, fn, args)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+
+
+DB = web.AppKey('db', DatabaseWorkers)
+
+routes = web.RouteTableDef()
+
+# Same JSON as Flask's jsonify (sorted keys)
+json_response = partial(web.json_response, dumps=partial(json.dumps, sort_keys=True))
+
+
+async def get_json(request):
+    # Like Flask's request.get_json(silent=True)
+    if request.content_type != 'application/json':
+        return None
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+@routes.get('/')
+async def home(request):
+    return web.Response(text=sync_app.HOME_HTML, content_type='text/html')
+
+
+@routes.post('/books')
+async def add_book(request):
+    # Accept both form and JSON submissions
+    form = await request.post()
+    data = {} if form else (await get_json(request) or {})
+    title = form.get('title') or data.get('title')
+    author = form.get('author') or data.get('author')
+    if not title or not author:
+        return json_response({'error': 'Title and author are required'}, status=400)
+    book = await request.app[DB].run(sync_app.insert_book, title, author)
+    if form:
+        raise web.HTTPFound('/books/html')
+    return json_response(book, status=201)
+
+
+@routes.get('/books')
+async def get_books(request):
+    try:
+        rows, next_cursor = await request.app[DB].run(sync_app.page_of_books, request.query)
+    except ValueError:
+        return json_response({"error": sync_app.PAGE_ERROR}, status=400)
+    response = json_response([sync_app.row_to_dict(r) for r in rows])
+    if next_cursor is not None:
+        response.headers['Link'] = f'<{sync_app.next_page_url(request.path, request.query, next_cursor)}>; rel="next"'
+    return response
+
+
+@routes.get('/books/html')
+async def list_books_html(request):
+    try:
+        rows, next_cursor = await request.app[DB].run(sync_app.page_of_books, request.query)
+    except ValueError:
+        return web.Response(text=sync_app.PAGE_ERROR, status=400)
+    older_url = sync_app.next_page_url(request.path, request.query, next_cursor) if next_cursor else None
+    return web.Response(text=sync_app.books_html(rows, older_url), content_type='text/html')
+
+
+@routes.get(r'/books/{book_id:\d+}')
+async def get_book(request):
+    row = await request.app[DB].run(sync_app.find_book, int(request.match_info['book_id']))
+    if not row:
+        return json_response({"error": "Book not found"}, status=404)
+    return json_response(sync_app.row_to_dict(row))
+
+
+@routes.put(r'/books/{book_id:\d+}')
+async def update_book(request):
+    data = await get_json(request) or {}
+    title = (data.get('title') or '').strip()
+    author = (data.get('author') or '').strip()
+    if not title and not author:
+        return json_response({"error": "Nothing to update"}, status=400)
+    row = await request.app[DB].run(sync_app.update_book_row, int(request.match_info['book_id']), title, author)
+    if not row:
+        return json_response({"error": "Book not found"}, status=404)
+    return json_response(sync_app.row_to_dict(row))
+
+
+@routes.delete(r'/books/{book_id:\d+}')
+async def delete_book(request):
+    book_id = int(request.match_info['book_id'])
+    if not await request.app[DB].run(sync_app.delete_book_row, book_id):
+        return json_response({"error": "Book not found"}, status=404)
+    return json_response({"message": "deleted", "id": book_id})
+
+
+@routes.post('/books/batch')
+async def batch_books(request):
+    try:
+        checked, results = sync_app.plan_batch(await get_json(request))
+    except ValueError as e:
+        return json_response({"error": str(e)}, status=400)
+    await request.app[DB].run(sync_app.write_batch, checked, results)
+    return json_response(results)
+
+
+def make_app(db_path=None, db_workers=4):
+    application = web.Application(client_max_size=16 * 1024 * 1024)  # room for big batches
+    application[DB] = DatabaseWorkers(db_path or sync_app.DB_PATH, db_workers)
+    application.add_routes(routes)
+
+    async def close_db(application):
+        application[DB].close()
+    application.on_cleanup.append(close_db)
+    return application
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the Book API on asyncio (aiohttp)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--db-workers', type=int, default=4, help='database worker threads (default 4)')
+    args = parser.parse_args()
+
+    sync_app.init_db()
+    # A deep accept backlog so bursts of new clients queue instead of being refused
+    web.run_app(make_app(db_workers=args.db_workers), host=args.host, port=args.port, backlog=1024)
@@ -0,0 +1,177 @@
+# Load test: the Flask app vs the asyncio mode (async_app.py)
+#
+# Seeds a scratch database with books, starts each server in its own process
+# and hits it with many concurrent clients for a while: mostly page reads
+# (GET /books at random cursors, GET /books/<id>) plus some PUTs. Prints
+# requests/sec, p50/p99 latency and errors for each so they can be compared.
+#
+# The clients are aiohttp coroutines in this process, so with a very high
+# --concurrency the client side can become the limit - watch the CPU.
+#
+# Usage:
+#   python load_test.py
+#   python load_test.py --concurrency 1000 --seconds 20 --books 200000 --write-ratio 0.05
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def seed_database(path, count):
+    import app as sync_app
+    sync_app.DB_PATH = path
+    sync_app.init_db()
+    rng = random.Random(42)
+    authors = ['Robert Martin', 'Donald Knuth', 'Martin Fowler', 'Kent Beck', 'Andrew Hunt', 'Eric Evans']
+    with sqlite3.connect(path) as conn:
+        conn.executemany("INSERT INTO books(title, author) VALUES(?, ?)",
+                         ((f"Book {i}", rng.choice(authors)) for i in range(count)))
+
+
+def serve(mode, db_path, port):
+    """Run one of the servers in this process (the test starts these as subprocesses)"""
+    import app as sync_app
+    sync_app.DB_PATH = db_path
+    if mode == 'sync':
+        from werkzeug.serving import make_server
+        # Same threaded server app.run() uses, minus the debugger/reloader and request logging
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        server = make_server('127.0.0.1', port, sync_app.app, threaded=True)
+        server.socket.listen(1024)  # same backlog the async server gets
+        server.serve_forever()
+    else:
+        from aiohttp import web
+        import async_app
+        web.run_app(async_app.make_app(db_path), host='127.0.0.1', port=port, backlog=1024,
+                    access_log=None, print=None)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server didn't start on port {port}")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+async def client(session, base, rng, deadline, book_count, write_ratio, latencies, errors):
+    while time.perf_counter() < deadline:
+        book_id = rng.randint(1, book_count)
+        choice = rng.random()
+        start = time.perf_counter()
+        try:
+            if choice < write_ratio:
+                request = session.put(f"{base}/books/{book_id}", json={"title": f"Book {book_id} (edited)"})
+            elif choice < write_ratio + 0.3:
+                request = session.get(f"{base}/books/{book_id}")
+            else:
+                request = session.get(f"{base}/books", params={'limit': 20, 'cursor': book_id})
+            async with request as response:
+                await response.read()
+                ok = response.status < 500
+        except Exception:
+            ok = False
+        latencies.append(time.perf_counter() - start)
+        if not ok:
+            errors.append(1)
+
+
+async def run_clients(port, concurrency, seconds, book_count, write_ratio):
+    import aiohttp
+    latencies, errors = [], []
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        deadline = time.perf_counter() + seconds
+        started = time.perf_counter()
+        await asyncio.gather(*(client(session, f"http://127.0.0.1:{port}", random.Random(i), deadline,
+                                      book_count, write_ratio, latencies, errors)
+                               for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the Flask and asyncio Book API servers under load')
+    parser.add_argument('--concurrency', type=int, default=200, help='concurrent clients (default 200)')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--books', type=int, default=100000, help='books to seed')
+    parser.add_argument('--write-ratio', type=float, default=0.05, help='share of requests that are PUTs')
+    parser.add_argument('--modes', default='sync,async')
+    parser.add_argument('--output', help='also write the results here as JSON')
+    parser.add_argument('--serve', choices=['sync', 'async'], help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.db, args.port)
+        return
+
+    work_dir = tempfile.mkdtemp(prefix='books-load-')
+    seed_path = os.path.join(work_dir, 'seed.db')
+    report = {'concurrency': args.concurrency, 'seconds': args.seconds, 'books': args.books,
+              'write_ratio': args.write_ratio, 'modes': {}}
+    try:
+        print(f"Seeding {args.books} books...")
+        seed_database(seed_path, args.books)
+        for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+            db_path = os.path.join(work_dir, f'{mode}.db')
+            shutil.copy(seed_path, db_path)
+            port = free_port()
+            server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', mode,
+                                       '--db', db_path, '--port', str(port)], cwd=HERE)
+            try:
+                wait_for_port(port)
+                print(f"Running {mode} ({args.concurrency} clients, {args.seconds}s)...")
+                result = asyncio.run(run_clients(port, args.concurrency, args.seconds, args.books,
+                                                 args.write_ratio))
+            finally:
+                server.terminate()
+                server.wait()
+            report['modes'][mode] = result
+            print(f"  {result['requests_per_sec']} req/s  p50 {result['p50_ms']} ms  p99 {result['p99_ms']} ms  "
+                  f"{result['errors']} errors of {result['requests']}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# app.py and async_app.py sit next to each other, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,88 @@
+import random
+import sqlite3
+
+import pytest
+
+import app as books_app
+
+AUTHORS = ['Knuth', 'knuth jr', 'KNOX', 'Kent Beck', 'Martin Fowler', '@home', '[bracket]', 'Évariste', 'émile',
+           'Ölaf']
+
+
+def nocase(value):
+    # SQLite's NOCASE: only A-Z fold
+    return value.translate(books_app.ASCII_LOWER)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(books_app, 'DB_PATH', str(tmp_path / 'books.db'))
+    books_app.init_db()
+    rng = random.Random(7)
+    with sqlite3.connect(books_app.DB_PATH) as conn:
+        conn.executemany("INSERT INTO books(title, author) VALUES(?, ?)",
+                         ((f"{rng.choice(['Book', 'book', 'Art'])} {i}", rng.choice(AUTHORS)) for i in range(3000)))
+        conn.execute("ANALYZE")
+    return books_app.app.test_client()
+
+
+def walk(client, query):
+    books, url = [], f'/books?{query}'
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        books.extend(response.get_json())
+        link = response.headers.get('Link')
+        url = link[1:link.index('>')] if link else None
+    return books
+
+
+def all_books():
+    with sqlite3.connect(books_app.DB_PATH) as conn:
+        return [{'id': i, 'title': t, 'author': a} for i, t, a in conn.execute("SELECT id, title, author FROM books")]
+
+
+@pytest.mark.parametrize('query, column, prefix', [
+    ('limit=37&author=kn', 'author', 'kn'),
+    ('limit=50&author=KNUTH', 'author', 'knuth'),
+    ('limit=100&title=book 1', 'title', 'book 1'),
+    ('limit=20&author=@', 'author', '@'),
+    ('limit=40&author=É', 'author', 'É'),
+    ('limit=40&author=é', 'author', 'é'),
+    ('limit=40&author=Ö', 'author', 'Ö'),
+])
+def test_filtered_pages_cover_every_match_once_in_order(client, query, column, prefix):
+    expected = sorted((b for b in all_books() if nocase(b[column]).startswith(prefix)),
+                      key=lambda b: (nocase(b[column]), b['id']))
+    assert expected
+    assert walk(client, query) == expected
+
+
+def test_both_filters(client):
+    expected = sorted((b for b in all_books() if nocase(b['author']).startswith('kn')
+                       and nocase(b['title']).startswith('art')),
+                      key=lambda b: (nocase(b['author']), b['id']))
+    assert walk(client, 'limit=25&author=Kn&title=ART') == expected
+
+
+def test_unfiltered_pages_are_newest_first(client):
+    books = walk(client, 'limit=500')
+    assert [b['id'] for b in books] == list(range(3000, 0, -1))
+
+
+@pytest.mark.parametrize('args', [
+    {}, {'cursor': '1500'},
+    {'author': 'kn'}, {'author': 'kn', 'cursor': books_app.encode_cursor('knuth', 10)},
+    {'title': 'book'}, {'title': 'book', 'cursor': books_app.encode_cursor('book 5', 5)},
+    {'author': 'kn', 'title': 'art', 'cursor': books_app.encode_cursor('knox', 3)},
+])
+def test_pages_never_sort_in_a_temp_btree(client, args):
+    sql, params, _, _ = books_app.build_page_query(args)
+    with sqlite3.connect(books_app.DB_PATH) as conn:
+        plan = ' '.join(row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params))
+    assert 'TEMP B-TREE' not in plan
+
+
+def test_bad_cursor(client):
+    assert client.get('/books?author=kn&cursor=nonsense').status_code == 400
+    assert client.get('/books?cursor=abc').status_code == 400
@@ -0,0 +1,243 @@
+"""
+Funnel and conversion analytics, kept current by a trigger on status_history.
+
+Working these out from status_history directly means self-joining it to
+pair each status with the next one, on every request. Instead, each new
+status_history row updates a few small tables as it's inserted:
+
+    funnel_applications  one row per application: furthest funnel stage
+                         reached, whether the company ever responded, and
+                         its current status and since when
+    funnel_counts        (dimension, key, metric) -> count, where dimension
+                         is all/company/location/month (month applied) and
+                         metric is a stage name or 'responded'
+    stage_durations      (stage, days) -> count - a histogram of how long
+                         applications sat in each status, for the medians
+
+Reaching a stage counts every stage before it too, so an application first
+recorded as 'Offer' still counts as applied and interviewed. Statuses outside
+the funnel (Rejected, Withdrawn, ...) don't move an application forward, but
+anything other than Applied/Withdrawn counts as a response.
+
+status_history is append-only in the app. If rows are ever edited, deleted or
+inserted out of date order, rebuild_analytics() recounts everything.
+"""
+
+# Funnel stages in order - their position is the rank stored in funnel_applications
+STAGES = ['Applied', 'Interview', 'Offer']
+
+# Statuses that don't mean the company got back to us
+NO_RESPONSE = ('Applied', 'Withdrawn')
+
+DIMENSIONS = ('company', 'location', 'month')
+
+_RANK_SQL = 'CASE {status} ' + ' '.join(f"WHEN '{s}' THEN {i}" for i, s in enumerate(STAGES)) + ' ELSE 0 END'
+_RESPONDED_SQL = "({status} NOT IN ('" + "', '".join(NO_RESPONSE) + "'))"
+_STAGES_SQL = ' UNION ALL '.join(f"SELECT '{s}' AS stage, {i} AS rank" for i, s in enumerate(STAGES))
+
+# (application id, dimension, key) for applications matching {where} - a subquery, since triggers can't use WITH
+_DIMENSIONS_SQL = '''
+    SELECT id, 'all' AS dimension, '' AS key FROM applications {where}
+    UNION ALL SELECT id, 'company', COALESCE(company, '') FROM applications {where}
+    UNION ALL SELECT id, 'location', COALESCE(location, '') FROM applications {where}
+    UNION ALL SELECT id, 'month', COALESCE(strftime('%Y-%m', date_applied), '') FROM applications {where}
+'''
+
+_TRIGGER_BODY = f'''
+    -- How long the application sat in its previous status
+    INSERT INTO stage_durations (stage, days, count)
+    SELECT status, MAX(0, CAST(julianday(NEW.date_changed) - julianday(changed) AS INTEGER)), 1
+    FROM funnel_applications
+    WHERE application_id = NEW.application_id
+      AND julianday(NEW.date_changed) IS NOT NULL AND julianday(changed) IS NOT NULL
+    ON CONFLICT (stage, days) DO UPDATE SET count = count + 1;
+
+    -- Stages reached for the first time
+    INSERT INTO funnel_counts (dimension, key, metric, count)
+    SELECT d.dimension, d.key, s.stage, 1
+    FROM ({_DIMENSIONS_SQL.format(where='WHERE id = NEW.application_id')}) d, ({_STAGES_SQL}) s
+    WHERE s.rank > COALESCE((SELECT stage_rank FROM funnel_applications
+                             WHERE application_id = NEW.application_id), -1)
+      AND s.rank <= {_RANK_SQL.format(status='NEW.status')}
+    ON CONFLICT (dimension, key, metric) DO UPDATE SET count = count + 1;
+
+    -- First response
+    INSERT INTO funnel_counts (dimension, key, metric, count)
+    SELECT d.dimension, d.key, 'responded', 1
+    FROM ({_DIMENSIONS_SQL.format(where='WHERE id = NEW.application_id')}) d
+    WHERE {_RESPONDED_SQL.format(status='NEW.status')}
+      AND NOT COALESCE((SELECT responded FROM funnel_applications
+                        WHERE application_id = NEW.application_id), 0)
+    ON CONFLICT (dimension, key, metric) DO UPDATE SET count = count + 1;
+
+    INSERT INTO funnel_applications (application_id, stage_rank, responded, status, changed)
+    SELECT NEW.application_id, {_RANK_SQL.format(status='NEW.status')},
+           {_RESPONDED_SQL.format(status='NEW.status')}, NEW.status, NEW.date_changed
+    WHERE EXISTS (SELECT 1 FROM applications WHERE id = NEW.application_id)
+    ON CONFLICT (application_id) DO UPDATE SET
+        stage_rank = MAX(stage_rank, excluded.stage_rank),
+        responded = responded OR excluded.responded,
+        status = excluded.status,
+        changed = excluded.changed;
+'''
+
+
+def init_analytics(conn):
+    """Create the summary tables and trigger, backfilling if the tables are new"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'funnel_applications'"
+    ).fetchone()
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS funnel_applications (
+            application_id INTEGER PRIMARY KEY,
+            stage_rank INTEGER NOT NULL,
+            responded BOOLEAN NOT NULL,
+            status TEXT NOT NULL,
+            changed DATE
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS funnel_counts (
+            dimension TEXT NOT NULL,
+            key TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dimension, key, metric)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stage_durations (
+            stage TEXT NOT NULL,
+            days INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (stage, days)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS analytics_status_history_insert
+        AFTER INSERT ON status_history
+        BEGIN {_TRIGGER_BODY} END
+    ''')
+
+    if not exists:
+        rebuild_analytics(conn)
+
+
+def rebuild_analytics(conn):
+    """Recount everything from status_history, in date order"""
+    conn.execute('DELETE FROM funnel_applications')
+    conn.execute('DELETE FROM funnel_counts')
+    conn.execute('DELETE FROM stage_durations')
+
+    conn.execute(f'''
+        INSERT INTO funnel_applications (application_id, stage_rank, responded, status, changed)
+        SELECT application_id, stage_rank, responded, status, date_changed
+        FROM (
+            SELECT application_id, status, date_changed,
+                   MAX({_RANK_SQL.format(status='status')}) OVER app AS stage_rank,
+                   MAX({_RESPONDED_SQL.format(status='status')}) OVER app AS responded,
+                   ROW_NUMBER() OVER (app ORDER BY date_changed DESC, created_at DESC, id DESC) AS newest
+            FROM status_history
+            WHERE application_id IN (SELECT id FROM applications)
+            WINDOW app AS (PARTITION BY application_id)
+        )
+        WHERE newest = 1
+    ''')
+
+    dimensions = _DIMENSIONS_SQL.format(where='')
+    conn.execute(f'''
+        INSERT INTO funnel_counts (dimension, key, metric, count)
+        SELECT d.dimension, d.key, s.stage, COUNT(*)
+        FROM funnel_applications f
+        JOIN ({dimensions}) d ON d.id = f.application_id
+        JOIN ({_STAGES_SQL}) s ON s.rank <= f.stage_rank
+        GROUP BY d.dimension, d.key, s.stage
+        UNION ALL
+        SELECT d.dimension, d.key, 'responded', COUNT(*)
+        FROM funnel_applications f
+        JOIN ({dimensions}) d ON d.id = f.application_id
+        WHERE f.responded
+        GROUP BY d.dimension, d.key
+    ''')
+
+    conn.execute('''
+        INSERT INTO stage_durations (stage, days, count)
+        SELECT status, MAX(0, CAST(julianday(next_date) - julianday(date_changed) AS INTEGER)), COUNT(*)
+        FROM (
+            SELECT status, date_changed,
+                   LEAD(date_changed) OVER (PARTITION BY application_id
+                                            ORDER BY date_changed, created_at, id) AS next_date
+            FROM status_history
+            WHERE application_id IN (SELECT id FROM applications)
+        )
+        WHERE julianday(next_date) IS NOT NULL AND julianday(date_changed) IS NOT NULL
+        GROUP BY 1, 2
+    ''')
+
+
+def _median_days(histogram):
+    """Median of a {days: count} histogram (lower median for even totals)"""
+    total = sum(histogram.values())
+    seen = 0
+    for days in sorted(histogram):
+        seen += histogram[days]
+        if seen * 2 >= total:
+            return days
+    return None
+
+
+def _rate(part, whole):
+    return round(part / whole, 4) if whole else None
+
+
+def funnel(conn, limit=20):
+    """Everything /api/analytics returns
+
+    {'funnel': [{'stage', 'count', 'conversion'}] where conversion is from
+    the previous stage, 'median_days_in_stage': {status: days},
+    'response_rate': overall, and 'by_company'/'by_location'/'by_month':
+    [{'key', 'applications', 'responded', 'response_rate', <stage counts>}].
+    Companies and locations are the `limit` with the most applications,
+    months are the last `limit` in order.
+    """
+    overall = {metric: count for metric, count in conn.execute(
+        "SELECT metric, count FROM funnel_counts WHERE dimension = 'all'")}
+
+    stages = []
+    previous = None
+    for stage in STAGES:
+        count = overall.get(stage, 0)
+        stages.append({'stage': stage, 'count': count,
+                       'conversion': None if previous is None else _rate(count, previous)})
+        previous = count
+
+    histograms = {}
+    for stage, days, count in conn.execute('SELECT stage, days, count FROM stage_durations WHERE count > 0'):
+        histograms.setdefault(stage, {})[days] = count
+
+    result = {
+        'funnel': stages,
+        'median_days_in_stage': {stage: _median_days(h) for stage, h in sorted(histograms.items())},
+        'response_rate': _rate(overall.get('responded', 0), overall.get(STAGES[0], 0)),
+    }
+
+    pivot = ', '.join(f"SUM(CASE metric WHEN '{s}' THEN count ELSE 0 END) AS \"{s}\"" for s in STAGES)
+    for dimension in DIMENSIONS:
+        order = 'key DESC' if dimension == 'month' else f'"{STAGES[0]}" DESC, key'
+        rows = conn.execute(f'''
+            SELECT key, {pivot}, SUM(CASE metric WHEN 'responded' THEN count ELSE 0 END) AS responded
+            FROM funnel_counts WHERE dimension = ?
+            GROUP BY key ORDER BY {order} LIMIT ?
+        ''', (dimension, limit)).fetchall()
+        entries = []
+        for row in rows:
+            key, counts, responded = row[0], row[1:-1], row[-1]
+            entry = {'key': key, 'applications': counts[0], 'responded': responded,
+                     'response_rate': _rate(responded, counts[0])}
+            entry.update(zip(STAGES, counts))
+            entries.append(entry)
+        if dimension == 'month':
+            entries.reverse()
+        result[f'by_{dimension}'] = entries
+    return result
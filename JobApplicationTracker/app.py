@@ -14,25 +14,53 @@ Features:
 - Export data for reporting
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_file
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_file, Response, stream_with_context
 import sqlite3
-import pandas as pd
 import os
 from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
+import base64
 import json
+import logging
+
+import analytics
+import db
+import documents
+import export
+import import_applications
+import scheduler
+import search
+import stats
 
 app = Flask(__name__)
 app.secret_key = 'job-tracker-secret-key-change-in-production'
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Next to app.py rather than wherever it was started from
+app.config['DATABASE'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'job_tracker.db')
+app.config['APPLICATIONS_PAGE_SIZE'] = 50  # cards per page on /applications
+app.config['COUNT_ESTIMATE_CAP'] = 1000  # filtered counts stop here and show "1000+"
+# Where due reminders go: any of log, smtp, webhook (see scheduler.py)
+app.config['REMINDER_SINKS'] = os.environ.get('REMINDER_SINKS', 'log')
+app.config['REMINDER_SMTP_HOST'] = 'localhost'
+app.config['REMINDER_SMTP_PORT'] = 1025
+app.config['REMINDER_WEBHOOK_URL'] = os.environ.get('REMINDER_WEBHOOK_URL', '')
 
 # Create uploads directory
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Pooled connections (see db.py) - created on first use so DATABASE can still be changed
+db_pool = None
+db.init_app(app)
+
+# Set by start_reminder_scheduler() - None when running without one (tests, scripts)
+reminder_scheduler = None
+
 # Database setup
 def init_db():
-    conn = sqlite3.connect('job_tracker.db')
+    conn = sqlite3.connect(app.config['DATABASE'])
+    # WAL sticks to the database file, so every connection after this gets it
+    conn.execute('PRAGMA journal_mode = WAL')
     
     # Applications table
     conn.execute('''
@@ -97,29 +125,66 @@ def init_db():
         )
     ''')
     
+    # Child tables are always read by application_id, in date order
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_status_history_application ON status_history (application_id, date_changed, created_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_interviews_application ON interviews (application_id, interview_date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_reminders_application ON reminders (application_id, reminder_date)')
+    # /applications pages newest first, optionally within one status
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_applications_date ON applications (date_applied, created_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_applications_status_date ON applications (status, date_applied, created_at)')
+    
+    # Full-text index over all of the above, kept in sync by triggers (see search.py)
+    search.init_search(conn)
+    
+    # Dashboard counters, also trigger-maintained (see stats.py)
+    stats.init_stats(conn)
+    
+    # Funnel/conversion summaries, updated as status_history grows (see analytics.py)
+    analytics.init_analytics(conn)
+    
+    # Resumes/cover letters, stored once per unique file (see documents.py)
+    documents.init_documents(conn, app.config['UPLOAD_FOLDER'])
+    
+    # What the reminder scheduler has already sent
+    scheduler.init_scheduler_tables(conn)
+    
     conn.commit()
+    # Files left behind by failed adds
+    documents.delete_unreferenced(conn, app.config['UPLOAD_FOLDER'])
     conn.close()
 
+def start_reminder_scheduler():
+    global reminder_scheduler
+    reminder_scheduler = scheduler.ReminderScheduler(app.config['DATABASE'], scheduler.create_sinks(app.config))
+    return reminder_scheduler.start()
+
+def notify_scheduler(kind, source_id):
+    """Tell the scheduler a reminder/interview changed (call after committing)
+
+    source_id None re-reads all of that kind, for bulk changes.
+    """
+    if reminder_scheduler is not None:
+        reminder_scheduler.notify(kind, source_id)
+
+def get_pool():
+    global db_pool
+    if db_pool is None or db_pool.path != app.config['DATABASE']:
+        if db_pool is not None:
+            db_pool.close_all()
+        db_pool = db.ConnectionPool(app.config['DATABASE'])
+    return db_pool
+
 def get_db_connection():
-    conn = sqlite3.connect('job_tracker.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    """This request's pooled connection - conn.close() hands it back to the pool"""
+    return db.get_connection(get_pool())
 
 @app.route('/')
 def dashboard():
     """Main dashboard with overview stats and charts"""
     conn = get_db_connection()
     
-    # Get summary statistics
-    total_applications = conn.execute('SELECT COUNT(*) FROM applications').fetchone()[0]
-    
-    # Status breakdown
-    status_counts = conn.execute('''
-        SELECT status, COUNT(*) as count 
-        FROM applications 
-        GROUP BY status
-        ORDER BY count DESC
-    ''').fetchall()
+    # All the counts come from the trigger-maintained stats table in one query
+    summary = stats.dashboard_stats(conn)
     
     # Recent applications
     recent_apps = conn.execute('''
@@ -129,89 +194,157 @@ def dashboard():
         LIMIT 5
     ''').fetchall()
     
-    # Upcoming interviews
-    upcoming_interviews = conn.execute('''
-        SELECT i.interview_date, i.interview_type, a.company, a.position, i.interviewer_name
-        FROM interviews i
-        JOIN applications a ON i.application_id = a.id
-        WHERE i.interview_date >= date('now')
-        ORDER BY i.interview_date ASC
-        LIMIT 5
-    ''').fetchall()
+    # Upcoming interviews - skip the join entirely when the counters say there are none
+    upcoming_interviews = []
+    if summary['upcoming_interviews']:
+        upcoming_interviews = conn.execute('''
+            SELECT i.interview_date, i.interview_type, a.company, a.position, i.interviewer_name
+            FROM interviews i
+            JOIN applications a ON i.application_id = a.id
+            WHERE i.interview_date >= date('now')
+            ORDER BY i.interview_date ASC
+            LIMIT 5
+        ''').fetchall()
     
     # Pending reminders
-    pending_reminders = conn.execute('''
-        SELECT r.reminder_date, r.message, a.company, a.position
-        FROM reminders r
-        JOIN applications a ON r.application_id = a.id
-        WHERE r.is_completed = FALSE AND r.reminder_date <= date('now', '+7 days')
-        ORDER BY r.reminder_date ASC
-        LIMIT 5
-    ''').fetchall()
+    pending_reminders = []
+    if summary['due_reminders']:
+        pending_reminders = conn.execute('''
+            SELECT r.reminder_date, r.message, a.company, a.position
+            FROM reminders r
+            JOIN applications a ON r.application_id = a.id
+            WHERE r.is_completed = FALSE AND r.reminder_date <= date('now', '+7 days')
+            ORDER BY r.reminder_date ASC
+            LIMIT 5
+        ''').fetchall()
     
     conn.close()
     
     return render_template('dashboard.html',
-                         total_applications=total_applications,
-                         status_counts=status_counts,
+                         total_applications=summary['total'],
+                         status_counts=summary['status'],
+                         upcoming_count=summary['upcoming_interviews'],
+                         due_reminders_count=summary['due_reminders'],
                          recent_apps=recent_apps,
                          upcoming_interviews=upcoming_interviews,
                          pending_reminders=pending_reminders)
 
-@app.route('/applications')
-def applications():
-    """View all applications with filtering and sorting"""
-    conn = get_db_connection()
+def get_application_filters(args):
+    """Filter values from the query string plus the matching WHERE clauses
+
+    Shared by /applications and /export so both filter the same way. Returns
+    (filters, where_sql, params) - where_sql is a string of " AND ..." clauses.
+    """
+    filters = {
+        'status': args.get('status', ''),
+        'search': args.get('search', ''),
+        'company': args.get('company', ''),
+        'date_from': args.get('date_from', ''),
+        'date_to': args.get('date_to', ''),
+    }
+    where_sql = ''
+    params = []
     
-    # Get filter parameters
-    status_filter = request.args.get('status', '')
-    company_filter = request.args.get('company', '')
-    date_from = request.args.get('date_from', '')
-    date_to = request.args.get('date_to', '')
+    if filters['status']:
+        where_sql += " AND status = ?"
+        params.append(filters['status'])
     
-    # Build query - this could be cleaner but works for now
-    query = "SELECT * FROM applications WHERE 1=1"
-    params = []
+    # Full-text search over applications, interview feedback and reminders
+    match_query = search.build_match_query(filters['search'])
+    if match_query:
+        where_sql += f" AND id IN ({search.matching_application_ids_sql()})"
+        params.append(match_query)
     
-    if status_filter:
-        query += " AND status = ?"
-        params.append(status_filter)
+    if filters['company']:
+        where_sql += " AND company LIKE ?"
+        params.append(f"%{filters['company']}%")
     
-    if company_filter:
-        query += " AND company LIKE ?"
-        params.append(f'%{company_filter}%')
+    if filters['date_from']:
+        where_sql += " AND date_applied >= ?"
+        params.append(filters['date_from'])
     
-    if date_from:
-        query += " AND date_applied >= ?"
-        params.append(date_from)
+    if filters['date_to']:
+        where_sql += " AND date_applied <= ?"
+        params.append(filters['date_to'])
     
-    if date_to:
-        query += " AND date_applied <= ?"
-        params.append(date_to)
+    return filters, where_sql, params
+
+def encode_cursor(row):
+    """Opaque cursor for the page after this row"""
+    key = json.dumps([row['date_applied'], row['created_at'], row['id']])
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        date_applied, created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return date_applied, created_at, int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+def estimate_count(conn, filters, where_sql, params):
+    """(count, is_estimate) for the current filters
+
+    No filter or just a status is an exact number from the stats table. Anything
+    else counts matches up to COUNT_ESTIMATE_CAP and stops there.
+    """
+    other_filters = [k for k, v in filters.items() if v and k != 'status']
+    if not other_filters:
+        return stats.count_applications(conn, filters['status'] or None), False
+    
+    cap = app.config['COUNT_ESTIMATE_CAP']
+    count = conn.execute(f'''
+        SELECT COUNT(*) FROM (SELECT 1 FROM applications WHERE 1=1 {where_sql} LIMIT ?)
+    ''', params + [cap + 1]).fetchone()[0]
+    return min(count, cap), count > cap
+
+@app.route('/applications')
+def applications():
+    """View applications with filtering, a page at a time (newest first)"""
+    conn = get_db_connection()
+    
+    filters, where_sql, params = get_application_filters(request.args)
+    page_size = app.config['APPLICATIONS_PAGE_SIZE']
     
-    query += " ORDER BY date_applied DESC, created_at DESC"
+    # Keyset pagination - seek past the last row of the previous page instead of OFFSET
+    query = f"SELECT * FROM applications WHERE 1=1 {where_sql}"
+    page_params = list(params)
+    after = decode_cursor(request.args.get('cursor', ''))
+    if after:
+        query += " AND (date_applied, created_at, id) < (?, ?, ?)"
+        page_params.extend(after)
+    query += " ORDER BY date_applied DESC, created_at DESC, id DESC LIMIT ?"
+    page_params.append(page_size + 1)
     
-    applications = conn.execute(query, params).fetchall()
+    rows = conn.execute(query, page_params).fetchall()
+    applications = rows[:page_size]
     
-    # Get unique statuses for filter dropdown
-    statuses = conn.execute('SELECT DISTINCT status FROM applications ORDER BY status').fetchall()
+    next_url = None
+    if len(rows) > page_size:
+        next_args = {k: v for k, v in filters.items() if v}
+        next_url = url_for('applications', cursor=encode_cursor(applications[-1]), **next_args)
+    first_url = url_for('applications', **{k: v for k, v in filters.items() if v}) if after else None
+    
+    total, total_is_estimate = estimate_count(conn, filters, where_sql, params)
+    
+    # Status dropdown straight from the stats table
+    statuses = stats.statuses(conn)
     
     conn.close()
     
     return render_template('applications.html',
                          applications=applications,
                          statuses=statuses,
-                         filters={
-                             'status': status_filter,
-                             'company': company_filter,
-                             'date_from': date_from,
-                             'date_to': date_to
-                         })
+                         filters=filters,
+                         total=total,
+                         total_is_estimate=total_is_estimate,
+                         next_url=next_url,
+                         first_url=first_url)
 
 @app.route('/add_application', methods=['GET', 'POST'])
 def add_application():
     """Add a new job application"""
     if request.method == 'POST':
+        conn = None
         try:
             # Get form data
             company = request.form['company']
@@ -220,31 +353,26 @@ def add_application():
             date_applied = request.form['date_applied']
             status = request.form.get('status', 'Applied')
             salary_range = request.form.get('salary_range', '')
-            location = request.form.get('location', '')
+            location = request.form.get('location') or request.form.get('job_location', '')
             recruiter_name = request.form.get('recruiter_name', '')
             recruiter_email = request.form.get('recruiter_email', '')
             notes = request.form.get('notes', '')
             
-            # Handle file uploads
-            resume_file = ''
-            cover_letter_file = ''
-            
-            if 'resume' in request.files:
-                file = request.files['resume']
-                if file and file.filename:
-                    filename = secure_filename(f"{company}_{position}_resume_{file.filename}")
-                    file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                    resume_file = filename
-            
-            if 'cover_letter' in request.files:
-                file = request.files['cover_letter']
+            # Handle file uploads - each file is stored once under its content hash
+            conn = get_db_connection()
+            uploads = {}
+            for kind in documents.KINDS:
+                # The form calls them resume_file/cover_letter_file
+                file = request.files.get(f'{kind}_file') or request.files.get(kind)
                 if file and file.filename:
-                    filename = secure_filename(f"{company}_{position}_cover_{file.filename}")
-                    file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                    cover_letter_file = filename
+                    uploads[kind] = (documents.save_upload(conn, file, app.config['UPLOAD_FOLDER']),
+                                     secure_filename(file.filename))
+            # Keep the stored files' rows even if the insert below fails, so the cleanup can find them
+            conn.commit()
+            resume_file = uploads.get('resume', ('', ''))[1]
+            cover_letter_file = uploads.get('cover_letter', ('', ''))[1]
             
             # Insert into database
-            conn = get_db_connection()
             cursor = conn.execute('''
                 INSERT INTO applications 
                 (company, position, job_url, date_applied, status, salary_range, location,
@@ -261,6 +389,9 @@ def add_application():
                 VALUES (?, ?, ?)
             ''', (app_id, status, date_applied))
             
+            for kind, (doc_hash, filename) in uploads.items():
+                documents.attach(conn, app_id, kind, doc_hash, filename)
+            
             conn.commit()
             conn.close()
             
@@ -268,105 +399,291 @@ def add_application():
             return redirect(url_for('applications'))
             
         except Exception as e:
+            if conn is not None:
+                conn.rollback()
+                # Uploads this left unreferenced go on a later sweep, once they're an hour old
+                documents.delete_unreferenced(conn, app.config['UPLOAD_FOLDER'])
+                conn.close()
             flash(f'Error adding application: {str(e)}', 'error')
             return redirect(request.url)
     
     return render_template('add_application.html')
 
+# The whole detail page in one query - each child table comes back as a JSON array
+APPLICATION_DETAIL_SQL = '''
+    SELECT a.*,
+        (SELECT json_group_array(json_object('id', id, 'status', status, 'date_changed', date_changed,
+                                             'notes', notes, 'created_at', created_at))
+         FROM (SELECT * FROM status_history WHERE application_id = a.id
+               ORDER BY date_changed DESC, created_at DESC)) AS status_history_json,
+        (SELECT json_group_array(json_object('id', id, 'interview_date', interview_date,
+                                             'interview_type', interview_type,
+                                             'interviewer_name', interviewer_name,
+                                             'feedback', feedback, 'next_steps', next_steps))
+         FROM (SELECT * FROM interviews WHERE application_id = a.id
+               ORDER BY interview_date DESC)) AS interviews_json,
+        (SELECT json_group_array(json_object('id', id, 'reminder_date', reminder_date,
+                                             'reminder_type', reminder_type, 'message', message,
+                                             'is_completed', is_completed))
+         FROM (SELECT * FROM reminders WHERE application_id = a.id
+               ORDER BY reminder_date ASC)) AS reminders_json,
+        (SELECT json_group_array(json_object('kind', ad.kind, 'document_hash', ad.document_hash,
+                                             'filename', ad.filename, 'size', d.size,
+                                             'mime_type', d.mime_type))
+         FROM (SELECT * FROM application_documents WHERE application_id = a.id ORDER BY kind DESC) ad
+         JOIN documents d ON d.hash = ad.document_hash) AS documents_json
+    FROM applications a
+    WHERE a.id = ?
+'''
+
 @app.route('/application/<int:app_id>')
 def application_detail(app_id):
     """View detailed information about a specific application"""
     conn = get_db_connection()
+    row = conn.execute(APPLICATION_DETAIL_SQL, (app_id,)).fetchone()
+    conn.close()
     
-    # Get application details
-    application = conn.execute('SELECT * FROM applications WHERE id = ?', (app_id,)).fetchone()
-    
-    if not application:
+    if not row:
         flash('Application not found', 'error')
         return redirect(url_for('applications'))
     
-    # Get status history
-    status_history = conn.execute('''
-        SELECT * FROM status_history 
-        WHERE application_id = ? 
-        ORDER BY date_changed DESC, created_at DESC
-    ''', (app_id,)).fetchall()
-    
-    # Get interviews
-    interviews = conn.execute('''
-        SELECT * FROM interviews 
-        WHERE application_id = ? 
-        ORDER BY interview_date DESC
-    ''', (app_id,)).fetchall()
-    
-    # Get reminders
-    reminders = conn.execute('''
-        SELECT * FROM reminders 
-        WHERE application_id = ? 
-        ORDER BY reminder_date ASC
-    ''', (app_id,)).fetchall()
-    
-    conn.close()
+    application = {k: row[k] for k in row.keys() if not k.endswith('_json')}
+    children = {k[:-len('_json')]: json.loads(row[k] or '[]') for k in row.keys() if k.endswith('_json')}
     
     return render_template('application_detail.html',
                          application=application,
-                         status_history=status_history,
-                         interviews=interviews,
-                         reminders=reminders)
+                         documents=children['documents'],
+                         status_history=children['status_history'],
+                         interviews=children['interviews'],
+                         reminders=children['reminders'])
+
+@app.template_filter('datefmt')
+def format_date(value, fmt='%m/%d/%Y'):
+    """SQLite hands dates back as strings - parse them before formatting"""
+    if not value:
+        return ''
+    try:
+        return datetime.fromisoformat(str(value).replace('T', ' ')).strftime(fmt)
+    except ValueError:
+        return value
+
+@app.route('/documents/<doc_hash>')
+def download_document(doc_hash):
+    """Serve a stored document - supports Range requests and If-None-Match/If-Modified-Since"""
+    if not documents.HASH_RE.match(doc_hash):
+        return jsonify({'error': 'Document not found'}), 404
+    
+    conn = get_db_connection()
+    document = documents.get_document(conn, doc_hash)
+    conn.close()
+    
+    path = documents.document_path(app.config['UPLOAD_FOLDER'], doc_hash)
+    if not document or not os.path.exists(path):
+        return jsonify({'error': 'Document not found'}), 404
+    
+    name = secure_filename(request.args.get('name', '')) or doc_hash
+    # The URL is the content hash, so the file behind it can never change
+    return send_file(os.path.abspath(path), mimetype=document['mime_type'] or 'application/octet-stream',
+                     download_name=name, conditional=True, etag=doc_hash, max_age=31536000)
 
 @app.route('/api/dashboard-data')
 def dashboard_data():
     """API endpoint for dashboard charts"""
     conn = get_db_connection()
     
-    # Applications over time (last 6 months)
-    timeline_data = conn.execute('''
-        SELECT strftime('%Y-%m', date_applied) as month, COUNT(*) as count
-        FROM applications
-        WHERE date_applied >= date('now', '-6 months')
-        GROUP BY month
-        ORDER BY month
-    ''').fetchall()
-    
-    # Status breakdown
-    status_data = conn.execute('''
-        SELECT status, COUNT(*) as count
-        FROM applications
-        GROUP BY status
-        ORDER BY count DESC
-    ''').fetchall()
+    # Applications per month (last 6 months) and per status, from the stats table
+    summary = stats.dashboard_stats(conn)
     
     conn.close()
     
     return jsonify({
-        'timeline': [dict(row) for row in timeline_data],
-        'status': [dict(row) for row in status_data]
+        'timeline': summary['timeline'],
+        'status': summary['status']
     })
 
-@app.route('/export')
-def export_data():
-    """Export all applications to CSV"""
+@app.route('/api/applications/<int:app_id>/status', methods=['POST'])
+def update_status(app_id):
+    """Move an application to a new status (form or JSON: status, date_changed, notes)"""
+    data = request.form if request.form else (request.get_json(silent=True) or {})
+    status = (data.get('status') or '').strip()
+    if not status:
+        return jsonify({'error': 'status is required'}), 400
+    date_changed = data.get('date_changed') or datetime.now().strftime('%Y-%m-%d')
+    
+    conn = get_db_connection()
+    updated = conn.execute('UPDATE applications SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                           (status, app_id)).rowcount
+    if not updated:
+        conn.close()
+        return jsonify({'error': 'Application not found'}), 404
+    # The analytics trigger picks this up
+    conn.execute('INSERT INTO status_history (application_id, status, date_changed, notes) VALUES (?, ?, ?, ?)',
+                 (app_id, status, date_changed, data.get('notes', '')))
+    conn.commit()
+    conn.close()
+    
+    return jsonify({'id': app_id, 'status': status, 'date_changed': date_changed})
+
+@app.route('/api/analytics')
+def analytics_data():
+    """Funnel conversion, median days per stage and response rates (?limit=20 per breakdown)"""
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        limit = 20
+    
+    conn = get_db_connection()
+    result = analytics.funnel(conn, limit)
+    conn.close()
+    
+    return jsonify(result)
+
+@app.route('/api/reminders', methods=['POST'])
+def add_reminder():
+    """Add a reminder (form or JSON: application_id, reminder_date, reminder_type, message)"""
+    data = request.form if request.form else (request.get_json(silent=True) or {})
+    if not data.get('application_id') or not data.get('reminder_date'):
+        return jsonify({'error': 'application_id and reminder_date are required'}), 400
+    
+    conn = get_db_connection()
+    cursor = conn.execute('''
+        INSERT INTO reminders (application_id, reminder_date, reminder_type, message)
+        VALUES (?, ?, ?, ?)
+    ''', (data['application_id'], data['reminder_date'], data.get('reminder_type', ''), data.get('message', '')))
+    reminder_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+    
+    notify_scheduler('reminder', reminder_id)
+    return jsonify({'id': reminder_id}), 201
+
+@app.route('/api/reminders/<int:reminder_id>/complete', methods=['POST'])
+def complete_reminder(reminder_id):
     conn = get_db_connection()
+    updated = conn.execute('UPDATE reminders SET is_completed = TRUE WHERE id = ?', (reminder_id,)).rowcount
+    conn.commit()
+    conn.close()
     
-    # Get all applications
-    df = pd.read_sql_query('''
-        SELECT company, position, job_url, date_applied, status, salary_range, location,
-               recruiter_name, recruiter_email, notes
-        FROM applications
-        ORDER BY date_applied DESC
-    ''', conn)
+    if not updated:
+        return jsonify({'error': 'Reminder not found'}), 404
+    notify_scheduler('reminder', reminder_id)
+    return jsonify({'id': reminder_id, 'is_completed': True})
+
+@app.route('/api/interviews', methods=['POST'])
+def add_interview():
+    """Schedule an interview (form or JSON: application_id, interview_date, interview_type, interviewer_name)"""
+    data = request.form if request.form else (request.get_json(silent=True) or {})
+    if not data.get('application_id') or not data.get('interview_date'):
+        return jsonify({'error': 'application_id and interview_date are required'}), 400
     
+    conn = get_db_connection()
+    cursor = conn.execute('''
+        INSERT INTO interviews (application_id, interview_date, interview_type, interviewer_name)
+        VALUES (?, ?, ?, ?)
+    ''', (data['application_id'], data['interview_date'], data.get('interview_type', ''),
+          data.get('interviewer_name', '')))
+    interview_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+    
+    notify_scheduler('interview', interview_id)
+    return jsonify({'id': interview_id}), 201
+
+@app.route('/api/search')
+def search_api():
+    """Ranked full-text search with highlighted snippets (?q=...&limit=20)"""
+    text = request.args.get('q', '')
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        limit = 20
+    
+    conn = get_db_connection()
+    results = search.search(conn, text, limit)
     conn.close()
     
-    # Save to CSV
-    filename = f'job_applications_{datetime.now().strftime("%Y%m%d")}.csv'
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    df.to_csv(filepath, index=False)
+    return jsonify({'query': text, 'results': results})
+
+@app.route('/api/import', methods=['POST'])
+def import_data():
+    """Bulk import applications from CSV/JSON in the /export layout
+
+    Upload the file as `file` (format from its extension or ?format=csv|json),
+    or POST a JSON array of applications as the body. Returns how many were
+    imported plus the errors for each row that wasn't.
+    """
+    file = request.files.get('file')
+    if file and file.filename:
+        stream = file.stream
+        fmt = request.args.get('format') or import_applications.format_for(file.filename)
+    elif request.is_json:
+        stream = request.stream
+        fmt = 'json'
+    else:
+        return jsonify({'error': 'upload a CSV/JSON file as "file", or POST a JSON array'}), 400
+    if fmt not in ('csv', 'json'):
+        return jsonify({'error': 'format must be csv or json'}), 400
+    
+    conn = get_db_connection()
+    try:
+        result = import_applications.import_applications(conn, stream, fmt)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    finally:
+        conn.close()
+        # Schedule the imported interviews' reminders - even a failed import can have committed some batches
+        notify_scheduler('interview', None)
+    
+    return jsonify(result)
+
+@app.route('/export')
+def export_data():
+    """Stream applications as CSV (default), NDJSON or Parquet
+
+    Takes the same filters as /applications, plus ?format= and
+    ?include=status_history,interviews to nest those into each row.
+    """
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in export.FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(export.FORMATS)}"}), 400
+    if fmt == 'parquet' and not export.parquet_available():
+        return jsonify({'error': 'Parquet export needs pyarrow (pip install pyarrow)'}), 501
+    
+    include = [name.strip() for name in request.args.get('include', '').split(',') if name.strip()]
+    unknown = [name for name in include if name not in export.INCLUDES]
+    if unknown:
+        return jsonify({'error': f"can't include: {', '.join(unknown)}"}), 400
+    
+    _, where_sql, params = get_application_filters(request.args)
+    sql, params = export.build_export_query(where_sql, params, include)
+    
+    # Plain tuples here - export.py builds its own dicts
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(sql, params)
+    
+    def generate():
+        try:
+            yield from export.stream(cursor, fmt, include)
+        finally:
+            conn.close()
     
-    return send_file(filepath, as_attachment=True, download_name=filename)
+    mimetype, extension = export.FORMATS[fmt]
+    # Seconds in the name - nothing is written to disk anymore, it's just what the browser saves
+    filename = f'job_applications_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
 
 if __name__ == '__main__':
     init_db()
+    use_reloader = True
+    # The reloader's parent process only watches files and runs the app in a child
+    # (WERKZEUG_RUN_MAIN set) - the scheduler goes wherever the app actually runs
+    if not use_reloader or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        logging.basicConfig(level=logging.INFO)
+        start_reminder_scheduler()
     print("Starting Job Application Tracker...")
     print("Dashboard will be available at http://localhost:5002")
-    app.run(debug=True, port=5002)  # Different port to avoid conflicts
+    app.run(debug=True, use_reloader=use_reloader, port=5002)  # Different port to avoid conflicts
@@ -0,0 +1,119 @@
+"""
+Pooled SQLite connections for the tracker.
+
+Opening a connection per request (and re-running the pragmas, and losing the
+prepared statement cache every time) showed up in profiles, and with the
+default rollback journal one writer blocked every reader. This keeps a pool
+of connections that are already set up:
+
+- WAL journaling, so readers and the writer don't block each other
+- synchronous=NORMAL (safe with WAL), a bigger page cache and mmap
+- sqlite3's per-connection statement cache, which only pays off because the
+  connections are reused
+
+A thread checks a connection out, uses it, and conn.close() hands it back to
+the pool instead of closing it. In a request that happens at app-context
+teardown at the latest, so a route that forgets to close can't leak one.
+"""
+
+import sqlite3
+import threading
+
+from flask import g, has_app_context
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,  # negative = KiB, so ~16MB
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,
+}
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() returns it to its pool"""
+
+    pool = None
+    in_pool = False
+    checkout = None  # new object every time it leaves the pool
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        elif not self.in_pool:
+            self.pool.release(self)
+
+    def really_close(self):
+        super().close()
+
+
+class ConnectionPool:
+    def __init__(self, path, pragmas=None, max_idle=8, cached_statements=256):
+        self.path = path
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self.max_idle = max_idle
+        self.cached_statements = cached_statements
+        self._idle = []
+        self._lock = threading.Lock()
+        self.created = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, factory=PooledConnection,
+                               cached_statements=self.cached_statements,
+                               check_same_thread=False)  # it moves threads between checkouts
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        conn.pool = self
+        self.created += 1
+        return conn
+
+    def acquire(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        conn.in_pool = False
+        conn.checkout = object()
+        return conn
+
+    def release(self, conn):
+        # Whatever the last user didn't commit gets thrown away, same as closing would
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = sqlite3.Row
+        conn.in_pool = True
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.really_close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.really_close()
+
+
+def get_connection(pool):
+    """The request's connection (checked out on first use), or a fresh checkout outside a request"""
+    if not has_app_context():
+        return pool.acquire()
+    conn = g.get('_db_conn')
+    # If the route already closed it, it may be someone else's by now
+    if conn is None or conn.in_pool or conn.checkout is not g.get('_db_checkout'):
+        conn = g._db_conn = pool.acquire()
+        g._db_checkout = conn.checkout
+    return conn
+
+
+def init_app(app):
+    """Hand the request's connection back to the pool when the app context ends"""
+    @app.teardown_appcontext
+    def release_connection(exception):
+        conn = g.pop('_db_conn', None)
+        checkout = g.pop('_db_checkout', None)
+        if conn is not None and conn.checkout is checkout and not conn.in_pool:
+            conn.close()
@@ -0,0 +1,198 @@
+"""
+Content-addressed storage for resumes and cover letters.
+
+Uploads are streamed to disk in chunks while being hashed, then stored once
+under their SHA-256 - uploads/documents/ab/abcdef... - so sending the same
+resume to 200 companies keeps one copy, and two applications with the same
+company/position can't overwrite each other's files anymore.
+
+documents has one row per stored file with a ref_count, and
+application_documents links applications to them (one resume and one cover
+letter each). Triggers on the link table keep ref_count right; files nothing
+points at any more get removed by delete_unreferenced(), which the app runs at
+startup and after a failed add.
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+
+CHUNK_SIZE = 1024 * 1024
+
+KINDS = ('resume', 'cover_letter')
+
+HASH_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def init_documents(conn, upload_folder):
+    """Create the tables and triggers, importing old-style uploads if the tables are new"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'documents'"
+    ).fetchone()
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS documents (
+            hash TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mime_type TEXT,
+            ref_count INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS application_documents (
+            application_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            document_hash TEXT NOT NULL,
+            filename TEXT,
+            PRIMARY KEY (application_id, kind),
+            FOREIGN KEY (application_id) REFERENCES applications (id),
+            FOREIGN KEY (document_hash) REFERENCES documents (hash)
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS documents_ref_insert AFTER INSERT ON application_documents
+        BEGIN
+            UPDATE documents SET ref_count = ref_count + 1 WHERE hash = NEW.document_hash;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS documents_ref_delete AFTER DELETE ON application_documents
+        BEGIN
+            UPDATE documents SET ref_count = ref_count - 1 WHERE hash = OLD.document_hash;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS documents_ref_update AFTER UPDATE OF document_hash ON application_documents
+        BEGIN
+            UPDATE documents SET ref_count = ref_count - 1 WHERE hash = OLD.document_hash;
+            UPDATE documents SET ref_count = ref_count + 1 WHERE hash = NEW.document_hash;
+        END
+    ''')
+    # Deleting an application lets go of its documents
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS documents_application_delete AFTER DELETE ON applications
+        BEGIN
+            DELETE FROM application_documents WHERE application_id = OLD.id;
+        END
+    ''')
+
+    if not exists:
+        import_legacy_uploads(conn, upload_folder)
+
+
+def document_path(upload_folder, doc_hash):
+    return os.path.join(upload_folder, 'documents', doc_hash[:2], doc_hash)
+
+
+def store_stream(stream, upload_folder, chunk_size=CHUNK_SIZE):
+    """Copy a file stream into the store, returns (hash, size)
+
+    The stream is read chunk by chunk into a temp file next to the store while
+    it's hashed, then moved into place - or thrown away if that content is
+    already stored.
+    """
+    store_dir = os.path.join(upload_folder, 'documents')
+    os.makedirs(store_dir, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=store_dir, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as temp:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                temp.write(chunk)
+                size += len(chunk)
+
+        doc_hash = digest.hexdigest()
+        path = document_path(upload_folder, doc_hash)
+        if os.path.exists(path):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return doc_hash, size
+
+
+def register(conn, doc_hash, size, mime_type=None):
+    conn.execute('INSERT OR IGNORE INTO documents (hash, size, mime_type) VALUES (?, ?, ?)',
+                 (doc_hash, size, mime_type))
+
+
+def attach(conn, application_id, kind, doc_hash, filename):
+    """Link a stored document to an application (replacing any earlier one of that kind)"""
+    # An upsert rather than INSERT OR REPLACE, so the update trigger fixes the ref counts
+    conn.execute('''
+        INSERT INTO application_documents (application_id, kind, document_hash, filename)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (application_id, kind) DO UPDATE SET
+            document_hash = excluded.document_hash,
+            filename = excluded.filename
+    ''', (application_id, kind, doc_hash, filename))
+
+
+def save_upload(conn, file, upload_folder):
+    """Store a werkzeug FileStorage and register it, returns its hash"""
+    doc_hash, size = store_stream(file.stream, upload_folder)
+    mime_type = file.mimetype or mimetypes.guess_type(file.filename)[0]
+    register(conn, doc_hash, size, mime_type)
+    return doc_hash
+
+
+def get_document(conn, doc_hash):
+    return conn.execute('SELECT hash, size, mime_type, ref_count FROM documents WHERE hash = ?',
+                        (doc_hash,)).fetchone()
+
+
+def delete_unreferenced(conn, upload_folder):
+    """Remove documents no application points to, returns how many were removed
+
+    Anything stored in the last hour is left alone - an upload in progress
+    registers its document a moment before the application links to it.
+    Commits, and only then removes the files of the rows it deleted.
+    """
+    orphans = [row[0] for row in conn.execute('''
+        SELECT hash FROM documents
+        WHERE ref_count <= 0 AND created_at < datetime('now', '-1 hour')
+    ''')]
+    # Something may have linked one since the SELECT - only the rows actually deleted lose their file
+    deleted = [doc_hash for doc_hash in orphans
+               if conn.execute('DELETE FROM documents WHERE hash = ? AND ref_count <= 0',
+                               (doc_hash,)).rowcount == 1]
+    conn.commit()
+    for doc_hash in deleted:
+        # Unless the same content was uploaded again in the meantime
+        if get_document(conn, doc_hash):
+            continue
+        path = document_path(upload_folder, doc_hash)
+        if os.path.exists(path):
+            os.remove(path)
+    return len(deleted)
+
+
+def import_legacy_uploads(conn, upload_folder):
+    """Copy files saved the old way (uploads/<company>_<position>_resume_...) into the store"""
+    rows = conn.execute('''
+        SELECT id, resume_file, cover_letter_file FROM applications
+        WHERE COALESCE(resume_file, '') != '' OR COALESCE(cover_letter_file, '') != ''
+    ''').fetchall()
+    for app_id, *filenames in rows:
+        for kind, filename in zip(KINDS, filenames):
+            path = os.path.join(upload_folder, filename or '')
+            if not filename or not os.path.isfile(path):
+                continue
+            with open(path, 'rb') as f:
+                doc_hash, size = store_stream(f, upload_folder)
+            register(conn, doc_hash, size, mimetypes.guess_type(filename)[0])
+            attach(conn, app_id, kind, doc_hash, filename)
@@ -0,0 +1,153 @@
+"""
+Streaming export of applications as CSV, NDJSON or Parquet.
+
+Rows come straight off the sqlite cursor a batch at a time and go out as
+response chunks, so an export never writes a file or holds the whole table
+in memory. Status history and interviews can be nested into each row; they
+come from correlated json_group_array subqueries, so it's still one query.
+
+Parquet needs pyarrow, which is optional - the other formats work without it.
+"""
+
+import csv
+import io
+import json
+
+# Same columns (and order) the CSV export always had
+COLUMNS = ['company', 'position', 'job_url', 'date_applied', 'status', 'salary_range', 'location',
+           'recruiter_name', 'recruiter_email', 'notes']
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# Nested per-application lists, oldest first
+INCLUDES = {
+    'status_history': ('''
+        (SELECT json_group_array(json_object('status', status, 'date_changed', date_changed, 'notes', notes))
+         FROM (SELECT status, date_changed, notes FROM status_history
+               WHERE application_id = a.id ORDER BY date_changed, created_at))
+    ''', ['status', 'date_changed', 'notes']),
+    'interviews': ('''
+        (SELECT json_group_array(json_object('interview_date', interview_date,
+                                             'interview_type', interview_type,
+                                             'interviewer_name', interviewer_name,
+                                             'feedback', feedback, 'next_steps', next_steps))
+         FROM (SELECT * FROM interviews WHERE application_id = a.id ORDER BY interview_date))
+    ''', ['interview_date', 'interview_type', 'interviewer_name', 'feedback', 'next_steps']),
+}
+
+BATCH_SIZE = 1000
+
+
+def build_export_query(where_sql='', params=(), include=()):
+    """SELECT for the export, where_sql being the /applications filter clauses"""
+    select = ', '.join(f'a.{c}' for c in COLUMNS)
+    for name in include:
+        select += f', {INCLUDES[name][0].strip()} AS {name}'
+    sql = f'SELECT {select} FROM applications a WHERE 1=1 {where_sql} ORDER BY a.date_applied DESC'
+    return sql, list(params)
+
+
+def iter_rows(cursor, include=()):
+    """Row dicts off the cursor, a batch at a time"""
+    while True:
+        batch = cursor.fetchmany(BATCH_SIZE)
+        if not batch:
+            return
+        rows = []
+        for row in batch:
+            record = dict(zip(COLUMNS, row))
+            for name, value in zip(include, row[len(COLUMNS):]):
+                record[name] = json.loads(value) if value else []
+            rows.append(record)
+        yield rows
+
+
+def stream_csv(cursor, include=()):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS + list(include))
+    for rows in iter_rows(cursor, include):
+        for record in rows:
+            # Nested lists go in as JSON text, there's no better way in a CSV cell
+            writer.writerow([record[c] for c in COLUMNS] + [json.dumps(record[n]) for n in include])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_ndjson(cursor, include=()):
+    for rows in iter_rows(cursor, include):
+        yield ''.join(json.dumps(record) + '\n' for record in rows)
+
+
+class _ChunkSink(io.RawIOBase):
+    """File-like that collects whatever pyarrow writes until we drain it"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_schema(include=()):
+    import pyarrow as pa
+    fields = [pa.field(c, pa.string()) for c in COLUMNS]
+    for name in include:
+        nested = pa.struct([pa.field(k, pa.string()) for k in INCLUDES[name][1]])
+        fields.append(pa.field(name, pa.list_(nested)))
+    return pa.schema(fields)
+
+
+def stream_parquet(cursor, include=()):
+    """One Parquet row group per batch, each sent as soon as it's written"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema(include)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for rows in iter_rows(cursor, include):
+            for record in rows:
+                for c in COLUMNS:
+                    if record[c] is not None:
+                        record[c] = str(record[c])
+                for name in include:
+                    record[name] = [{k: None if v is None else str(v) for k, v in item.items()}
+                                    for item in record[name]]
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()  # the footer
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def stream(cursor, fmt, include=()):
+    if fmt == 'csv':
+        return stream_csv(cursor, include)
+    if fmt == 'ndjson':
+        return stream_ndjson(cursor, include)
+    return stream_parquet(cursor, include)
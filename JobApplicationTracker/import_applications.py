@@ -0,0 +1,253 @@
+"""
+Bulk import of applications from CSV or JSON.
+
+Takes the same layout /export produces - company, position, job_url,
+date_applied, status, ... - so a spreadsheet of old applications (or an
+export from another copy of the tracker) goes in with one request instead of
+hundreds of form posts. JSON can be an array of objects or NDJSON, one object
+per line. status_history and interviews columns, if present (from
+/export?include=...), are imported too; otherwise each application gets its
+initial status history row like the form does.
+
+Rows are read and checked a batch at a time: the checks run on whole pandas
+columns, and the batch's valid rows go in with executemany in a single
+transaction. Invalid rows are skipped and reported with their row number.
+
+Usage:
+    python import_applications.py old_applications.csv
+    python import_applications.py --batch-size 5000 export.ndjson
+"""
+
+import argparse
+import io
+import itertools
+import json
+import os
+import sys
+
+import pandas as pd
+
+from export import COLUMNS, INCLUDES
+
+REQUIRED = ['company', 'position', 'date_applied']
+
+FORMATS = {'.csv': 'csv', '.json': 'json', '.ndjson': 'json', '.jsonl': 'json'}
+
+BATCH_SIZE = 1000
+
+# Past this many the report just gives the count
+MAX_ERRORS = 1000
+
+EMAIL_RE = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+
+
+def format_for(filename, default='csv'):
+    return FORMATS.get(os.path.splitext(filename or '')[1].lower(), default)
+
+
+def read_batches(stream, fmt, batch_size=BATCH_SIZE):
+    """DataFrames of up to batch_size rows from a binary CSV/JSON stream"""
+    if fmt == 'csv':
+        # Everything as text - the checks decide what's valid, not pandas' type guessing
+        for chunk in pd.read_csv(stream, dtype=str, keep_default_na=False, chunksize=batch_size):
+            yield chunk
+        return
+
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    try:
+        lines = iter(text)
+        first = next((line for line in lines if line.strip()), '')
+        if first.lstrip().startswith('['):
+            records = json.loads(first + text.read())
+            for start in range(0, len(records), batch_size):
+                yield pd.DataFrame.from_records(records[start:start + batch_size])
+            return
+
+        records = []
+        for line in itertools.chain([first], lines):
+            if line.strip():
+                records.append(json.loads(line))
+            if len(records) >= batch_size:
+                yield pd.DataFrame.from_records(records)
+                records = []
+        if records:
+            yield pd.DataFrame.from_records(records)
+    finally:
+        text.detach()  # the caller owns the stream
+
+
+def validate(df):
+    """Normalize a batch and check it, returns (clean DataFrame, {index: [errors]})
+
+    The clean frame has every export column as stripped text, date_applied as
+    YYYY-MM-DD and status defaulted to Applied; it only includes valid rows.
+    """
+    df = df.copy()
+    for column in COLUMNS:
+        if column not in df:
+            df[column] = ''
+        df[column] = df[column].where(df[column].notna(), '').astype(str).str.strip()
+
+    dates = pd.to_datetime(df['date_applied'], errors='coerce', format='mixed')
+    checks = [(df[column] == '', f'{column} is required') for column in REQUIRED]
+    checks += [
+        ((df['date_applied'] != '') & dates.isna(), "date_applied isn't a date"),
+        ((df['recruiter_email'] != '') & ~df['recruiter_email'].str.match(EMAIL_RE),
+         "recruiter_email isn't an email address"),
+        ((df['job_url'] != '') & ~df['job_url'].str.match(r'^https?://'),
+         'job_url should start with http:// or https://'),
+    ]
+
+    errors = {}
+    for mask, message in checks:
+        for index in df.index[mask]:
+            errors.setdefault(index, []).append(message)
+
+    # Nested lists are JSON text in a CSV, already lists in JSON
+    for name in INCLUDES:
+        if name not in df:
+            continue
+        parsed = []
+        for index, value in df[name].items():
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value) if value.strip() else []
+                except ValueError:
+                    value = None
+            elif not isinstance(value, list):
+                value = [] if value is None or value != value else None  # NaN when a row didn't have it
+            if value is None or not all(isinstance(item, dict) for item in value):
+                errors.setdefault(index, []).append(f"{name} isn't a JSON list of objects")
+                value = []
+            parsed.append(value)
+        df[name] = parsed
+
+    df['date_applied'] = dates.dt.strftime('%Y-%m-%d')
+    df.loc[df['status'] == '', 'status'] = 'Applied'
+    return df.drop(index=list(errors)), errors
+
+
+def write_batch(conn, df):
+    """Insert a validated batch - applications, status history and interviews - in one transaction
+
+    Returns (applications, interviews) inserted.
+    """
+    if df.empty:
+        return 0, 0
+    has_history = 'status_history' in df
+    has_interviews = 'interviews' in df
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Nothing else can insert until we commit, and AUTOINCREMENT ids only go up,
+        # so the new ids are exactly the ones above this, in insert order
+        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM applications').fetchone()[0]
+        conn.executemany(f'''
+            INSERT INTO applications ({', '.join(COLUMNS)})
+            VALUES ({', '.join('?' * len(COLUMNS))})
+        ''', df[COLUMNS].itertuples(index=False, name=None))
+        ids = [row[0] for row in conn.execute('SELECT id FROM applications WHERE id > ? ORDER BY id', (last_id,))]
+
+        history = []
+        interviews = []
+        for app_id, row in zip(ids, df.to_dict('records')):
+            entries = row['status_history'] if has_history else []
+            if entries:
+                # Oldest first, the analytics trigger expects them in order
+                for entry in sorted(entries, key=lambda e: str(e.get('date_changed') or '')):
+                    history.append((app_id, entry.get('status') or row['status'],
+                                    entry.get('date_changed') or row['date_applied'], entry.get('notes') or ''))
+            else:
+                history.append((app_id, row['status'], row['date_applied'], ''))
+            for entry in (row['interviews'] if has_interviews else []):
+                if entry.get('interview_date'):
+                    interviews.append((app_id, entry['interview_date'], entry.get('interview_type') or '',
+                                       entry.get('interviewer_name') or '', entry.get('feedback') or '',
+                                       entry.get('next_steps') or ''))
+
+        conn.executemany('INSERT INTO status_history (application_id, status, date_changed, notes) VALUES (?, ?, ?, ?)',
+                         history)
+        conn.executemany('''
+            INSERT INTO interviews (application_id, interview_date, interview_type, interviewer_name, feedback, next_steps)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', interviews)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return len(ids), len(interviews)
+
+
+def import_applications(conn, stream, fmt='csv', batch_size=BATCH_SIZE, progress=None):
+    """Import a CSV/JSON stream, returns {'total', 'imported', 'failed', 'errors', 'interviews'}
+
+    errors is [{'row': n, 'errors': [...]}] with 1-based row numbers (data rows,
+    not counting a CSV header), at most MAX_ERRORS of them. Raises ValueError
+    if the file can't be read or doesn't have a required column at all - no
+    more batches are imported then. progress(result) is called after each batch.
+    interviews is how many interviews came in with the applications.
+    """
+    result = {'total': 0, 'imported': 0, 'failed': 0, 'errors': [], 'interviews': 0}
+    try:
+        for batch in read_batches(stream, fmt, batch_size):
+            # Later JSON batches can lack a key entirely - those rows just fail the checks
+            missing = [column for column in REQUIRED if column not in batch]
+            if missing and result['total'] == 0:
+                raise ValueError(f"missing column{'s' if len(missing) > 1 else ''}: {', '.join(missing)}")
+
+            clean, errors = validate(batch.reset_index(drop=True))
+            for index in sorted(errors):
+                if len(result['errors']) < MAX_ERRORS:
+                    result['errors'].append({'row': result['total'] + index + 1, 'errors': errors[index]})
+            result['failed'] += len(errors)
+            imported, interviews = write_batch(conn, clean)
+            result['imported'] += imported
+            result['interviews'] += interviews
+            result['total'] += len(batch)
+            if progress:
+                progress(result)
+    except (pd.errors.ParserError, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"couldn't read the file: {e}")
+    return result
+
+
+def main(argv=None):
+    import app as tracker
+
+    parser = argparse.ArgumentParser(description='Import applications from CSV or JSON (the /export layout)')
+    parser.add_argument('file', help='CSV, JSON array or NDJSON file')
+    parser.add_argument('--format', choices=['csv', 'json'], help='default: from the file extension')
+    parser.add_argument('--db', default=tracker.app.config['DATABASE'], help='database file')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='rows per transaction')
+    args = parser.parse_args(argv)
+
+    tracker.app.config['DATABASE'] = args.db
+    tracker.init_db()
+    conn = tracker.get_db_connection()
+
+    def report(result):
+        print(f"  {result['total']} rows read, {result['imported']} imported", end='\r')
+
+    try:
+        with open(args.file, 'rb') as f:
+            result = import_applications(conn, f, args.format or format_for(args.file),
+                                         args.batch_size, progress=report)
+    except ValueError as e:
+        print(f'Import failed: {e}')
+        return 1
+    finally:
+        conn.close()
+
+    print(f"Imported {result['imported']} of {result['total']} applications, {result['failed']} rows with errors")
+    if result['interviews']:
+        # The scheduler lives in the app's process - /api/import tells it, this can't
+        print(f"  {result['interviews']} interviews imported - restart a running tracker so their reminders go out")
+    for error in result['errors']:
+        print(f"  row {error['row']}: {'; '.join(error['errors'])}")
+    if result['failed'] > len(result['errors']):
+        print(f"  ... and {result['failed'] - len(result['errors'])} more")
+    return 1 if result['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
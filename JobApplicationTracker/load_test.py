@@ -0,0 +1,215 @@
+"""
+Concurrency load test for the tracker's database layer.
+
+Seeds a scratch database, then has a bunch of threads hammer the app through
+Flask's test client with a mix of page loads, API reads and writes (new
+applications, reminders, interviews) for a fixed time. It runs twice:
+
+- pooled: the db.py pool as the app uses it (WAL, synchronous=NORMAL, ...)
+- baseline: how it used to be - a new connection per request, rollback
+  journal, synchronous=FULL
+
+and prints requests/sec, p50/p99 latency and errors (mostly "database is
+locked") for reads and writes separately.
+
+Usage:
+    python load_test.py
+    python load_test.py --threads 16 --seconds 20 --write-ratio 0.3 --seed-rows 20000
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+import db
+
+COMPANIES = ['Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark Industries', 'Wayne Enterprises',
+             'Wonka', 'Cyberdyne', 'Soylent', 'Tyrell', 'Aperture']
+POSITIONS = ['Software Engineer', 'Data Analyst', 'Backend Developer', 'Product Manager',
+             'DevOps Engineer', 'Data Scientist', 'Frontend Developer']
+STATUSES = ['Applied', 'Phone Screen', 'Interview', 'Offer', 'Rejected']
+SEARCH_TERMS = ['engineer', 'data', 'acme', 'backend', 'remote', 'python']
+
+# Old behaviour: nothing kept idle, default journal, fully synchronous
+BASELINE_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': 5000}
+
+
+def seed_database(path, rows, rng):
+    import app as tracker
+    tracker.app.config['DATABASE'] = path
+    tracker.init_db()
+
+    conn = sqlite3.connect(path)
+    today = date.today()
+    applications = []
+    for _ in range(rows):
+        applied = today - timedelta(days=rng.randrange(365))
+        applications.append((rng.choice(COMPANIES), rng.choice(POSITIONS), applied.isoformat(),
+                             rng.choice(STATUSES), 'Remote' if rng.random() < 0.3 else 'Onsite',
+                             'Seeded by load_test.py'))
+    with conn:
+        conn.executemany('''
+            INSERT INTO applications (company, position, date_applied, status, location, notes)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', applications)
+        conn.execute('''
+            INSERT INTO status_history (application_id, status, date_changed)
+            SELECT id, status, date_applied FROM applications
+        ''')
+    conn.close()
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def worker(client, rng, deadline, write_ratio, max_app_id, results, lock):
+    latencies = {'read': [], 'write': []}
+    errors = {'read': 0, 'write': 0}
+    while time.perf_counter() < deadline:
+        if rng.random() < write_ratio:
+            kind = 'write'
+            choice = rng.random()
+            if choice < 0.5:
+                day = (date.today() + timedelta(days=rng.randrange(30))).isoformat()
+                call = lambda: client.post('/api/reminders', json={
+                    'application_id': rng.randint(1, max_app_id), 'reminder_date': day,
+                    'reminder_type': 'Follow-up', 'message': 'load test'})
+            elif choice < 0.75:
+                day = (date.today() + timedelta(days=rng.randrange(30))).isoformat()
+                call = lambda: client.post('/api/interviews', json={
+                    'application_id': rng.randint(1, max_app_id), 'interview_date': f'{day} 10:00',
+                    'interview_type': 'Phone'})
+            else:
+                call = lambda: client.post('/add_application', data={
+                    'company': rng.choice(COMPANIES), 'position': rng.choice(POSITIONS),
+                    'date_applied': date.today().isoformat(), 'status': 'Applied'})
+        else:
+            kind = 'read'
+            choice = rng.random()
+            if choice < 0.3:
+                call = lambda: client.get('/')
+            elif choice < 0.55:
+                call = lambda: client.get('/applications', query_string={'status': rng.choice(STATUSES)})
+            elif choice < 0.75:
+                call = lambda: client.get('/api/search', query_string={'q': rng.choice(SEARCH_TERMS)})
+            elif choice < 0.9:
+                call = lambda: client.get('/api/dashboard-data')
+            else:
+                call = lambda: client.get(f'/application/{rng.randint(1, max_app_id)}')
+
+        start = time.perf_counter()
+        try:
+            response = call()
+            # add_application flashes the error and redirects back to itself when it fails
+            failed = response.status_code >= 400 or (
+                response.status_code == 302 and response.headers.get('Location', '').endswith('/add_application'))
+        except Exception:
+            failed = True
+        latencies[kind].append(time.perf_counter() - start)
+        if failed:
+            errors[kind] += 1
+
+    with lock:
+        for kind in latencies:
+            results['latencies'][kind].extend(latencies[kind])
+            results['errors'][kind] += errors[kind]
+
+
+def run_mode(name, seed_path, threads, seconds, write_ratio, seed_rows, pool_options):
+    import app as tracker
+
+    work_dir = tempfile.mkdtemp(prefix=f'tracker-load-{name}-')
+    path = os.path.join(work_dir, 'job_tracker.db')
+    shutil.copy(seed_path, path)
+
+    tracker.app.config['DATABASE'] = path
+    tracker.db_pool = db.ConnectionPool(path, **pool_options)
+    results = {'latencies': {'read': [], 'write': []}, 'errors': {'read': 0, 'write': 0}}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    workers = [threading.Thread(target=worker, args=(tracker.app.test_client(), random.Random(i), deadline,
+                                                     write_ratio, seed_rows, results, lock))
+               for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    created = tracker.db_pool.created
+    tracker.db_pool.close_all()
+    tracker.db_pool = None
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    summary = {'connections_opened': created}
+    total = 0
+    for kind, latencies in results['latencies'].items():
+        total += len(latencies)
+        summary[kind] = {
+            'requests': len(latencies),
+            'errors': results['errors'][kind],
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        }
+    summary['requests_per_sec'] = round(total / elapsed, 1)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mixed read/write load test: pooled WAL connections vs the old setup')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--write-ratio', type=float, default=0.2, help='share of requests that write (default 0.2)')
+    parser.add_argument('--seed-rows', type=int, default=5000, help='applications to start with')
+    parser.add_argument('--modes', default='baseline,pooled', help='comma separated: baseline, pooled')
+    parser.add_argument('--output', help='also write the results here as JSON')
+    args = parser.parse_args()
+
+    modes = {
+        'baseline': {'pragmas': BASELINE_PRAGMAS, 'max_idle': 0},
+        'pooled': {'max_idle': args.threads},
+    }
+
+    seed_dir = tempfile.mkdtemp(prefix='tracker-load-seed-')
+    seed_path = os.path.join(seed_dir, 'job_tracker.db')
+    try:
+        print(f'Seeding {args.seed_rows} applications...')
+        seed_database(seed_path, args.seed_rows, random.Random(42))
+
+        report = {'threads': args.threads, 'seconds': args.seconds, 'write_ratio': args.write_ratio,
+                  'seed_rows': args.seed_rows, 'modes': {}}
+        for name in [m.strip() for m in args.modes.split(',') if m.strip()]:
+            if name not in modes:
+                parser.error(f'unknown mode: {name}')
+            print(f'Running {name} ({args.threads} threads, {args.seconds}s)...')
+            summary = run_mode(name, seed_path, args.threads, args.seconds, args.write_ratio,
+                               args.seed_rows, modes[name])
+            report['modes'][name] = summary
+            print(f"  {summary['requests_per_sec']} req/s, {summary['connections_opened']} connections opened")
+            for kind in ('read', 'write'):
+                s = summary[kind]
+                print(f"  {kind:5}  {s['requests']:6} requests  p50 {s['p50_ms']} ms  p99 {s['p99_ms']} ms  "
+                      f"{s['errors']} errors")
+    finally:
+        shutil.rmtree(seed_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
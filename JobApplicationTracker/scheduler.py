@@ -0,0 +1,301 @@
+"""
+Background scheduler that actually sends reminders when they come due.
+
+One thread keeps every pending reminder and upcoming interview in a min-heap
+ordered by due time and sleeps on a condition variable until the earliest
+one is due. Nothing polls the database: whatever inserts or changes a
+reminder/interview calls notify(), which re-reads that one row and pushes
+it onto the heap. Entries that were rescheduled, completed or deleted in the
+meantime are skipped when they come off the heap (lazy deletion), so there's
+no searching through the heap either.
+
+Delivery goes to one or more sinks - anything with a send(notification)
+method. Delivered notifications are recorded in sent_notifications so a
+restart doesn't send them again.
+"""
+
+import heapq
+import itertools
+import json
+import logging
+import smtplib
+import sqlite3
+import threading
+import time
+import urllib.request
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+logger = logging.getLogger('reminders')
+
+# Reminders only have a date, so they go out at this time of day
+REMINDER_TIME = '09:00'
+
+# How long before an interview to send the heads-up
+INTERVIEW_LEAD = timedelta(hours=1)
+
+# If every sink fails, try again this much later
+RETRY_DELAY = 300
+
+PENDING_REMINDERS_SQL = '''
+    SELECT r.id, r.reminder_date, r.reminder_type, r.message, a.id, a.company, a.position
+    FROM reminders r
+    LEFT JOIN applications a ON a.id = r.application_id
+    WHERE r.is_completed = FALSE {where}
+'''
+
+UPCOMING_INTERVIEWS_SQL = '''
+    SELECT i.id, i.interview_date, i.interview_type, i.interviewer_name, a.id, a.company, a.position
+    FROM interviews i
+    LEFT JOIN applications a ON a.id = i.application_id
+    WHERE i.interview_date >= date('now', '-1 day') {where}
+'''
+
+
+def init_scheduler_tables(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sent_notifications (
+            kind TEXT NOT NULL,
+            source_id INTEGER NOT NULL,
+            due_at TEXT NOT NULL,
+            sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (kind, source_id, due_at)
+        ) WITHOUT ROWID
+    ''')
+
+
+def _parse_when(value, default_time=None):
+    """datetime from a DATE or DATETIME column, None if it can't be read"""
+    value = str(value or '').strip().replace('T', ' ')
+    if default_time and len(value) == 10:
+        value = f'{value} {default_time}'
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _reminder_notification(row):
+    reminder_id, reminder_date, reminder_type, message, app_id, company, position = row
+    due = _parse_when(reminder_date, REMINDER_TIME)
+    if due is None:
+        return None
+    return {
+        'kind': 'reminder',
+        'id': reminder_id,
+        'due_at': due.isoformat(sep=' '),
+        'subject': f"Reminder: {reminder_type or 'Follow up'} - {company or 'application'}",
+        'message': message or '',
+        'application_id': app_id,
+        'company': company,
+        'position': position,
+    }
+
+
+def _interview_notification(row):
+    interview_id, interview_date, interview_type, interviewer, app_id, company, position = row
+    start = _parse_when(interview_date, '00:00')
+    if start is None or start < datetime.now():
+        return None  # no point in a heads-up for one that's already started
+    with_whom = f' with {interviewer}' if interviewer else ''
+    return {
+        'kind': 'interview',
+        'id': interview_id,
+        'due_at': (start - INTERVIEW_LEAD).isoformat(sep=' '),
+        'subject': f"Interview at {company or 'company'}: {interview_type or 'interview'}{with_whom}",
+        'message': f"{position or 'Interview'} at {company or ''}, starts {start.isoformat(sep=' ', timespec='minutes')}",
+        'application_id': app_id,
+        'company': company,
+        'position': position,
+    }
+
+
+class LogSink:
+    """Write reminders to the 'reminders' logger"""
+
+    def send(self, notification):
+        logger.info('%s | %s', notification['subject'], notification['message'])
+
+
+class SMTPSink:
+    """Email reminders - defaults to a local debugging SMTP server
+
+    e.g. `python -m aiosmtpd -n -l localhost:1025` prints everything it receives.
+    """
+
+    def __init__(self, host='localhost', port=1025, sender='tracker@localhost', recipient='me@localhost'):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipient = recipient
+
+    def send(self, notification):
+        email = EmailMessage()
+        email['Subject'] = notification['subject']
+        email['From'] = self.sender
+        email['To'] = self.recipient
+        email.set_content(notification['message'])
+        with smtplib.SMTP(self.host, self.port, timeout=10) as smtp:
+            smtp.send_message(email)
+
+
+class WebhookSink:
+    """POST each reminder as JSON (Slack/Discord-style incoming webhooks, or anything else)"""
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, notification):
+        body = json.dumps(dict(notification, text=f"{notification['subject']}\n{notification['message']}"))
+        request = urllib.request.Request(self.url, data=body.encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def create_sinks(config):
+    """Sinks from app config: REMINDER_SINKS is a comma separated list of log/smtp/webhook"""
+    sinks = []
+    for name in str(config.get('REMINDER_SINKS', 'log')).split(','):
+        name = name.strip()
+        if name == 'log':
+            sinks.append(LogSink())
+        elif name == 'smtp':
+            sinks.append(SMTPSink(config.get('REMINDER_SMTP_HOST', 'localhost'),
+                                  config.get('REMINDER_SMTP_PORT', 1025),
+                                  config.get('REMINDER_EMAIL_FROM', 'tracker@localhost'),
+                                  config.get('REMINDER_EMAIL_TO', 'me@localhost')))
+        elif name == 'webhook' and config.get('REMINDER_WEBHOOK_URL'):
+            sinks.append(WebhookSink(config['REMINDER_WEBHOOK_URL']))
+        elif name:
+            logger.warning('Unknown or unconfigured reminder sink: %s', name)
+    return sinks
+
+
+class ReminderScheduler:
+    def __init__(self, db_path, sinks=None):
+        self.db_path = db_path
+        self.sinks = sinks if sinks is not None else [LogSink()]
+        self._heap = []  # (due timestamp, tiebreak, key, notification)
+        self._pending = {}  # (kind, id) -> notification currently scheduled
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def start(self):
+        """Load everything pending and start the scheduler thread"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            init_scheduler_tables(conn)
+            conn.commit()
+            self._load(conn)
+        finally:
+            conn.close()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='reminder-scheduler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread:
+            self._thread.join()
+
+    def notify(self, kind, source_id):
+        """A reminder/interview was added or changed - re-read it and reschedule
+
+        With source_id None every pending one of that kind is re-read (after a
+        bulk import); whatever was already scheduled just gets replaced.
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self._load(conn, kind, source_id)
+        finally:
+            conn.close()
+
+    def _load(self, conn, kind=None, source_id=None):
+        sources = [('reminder', PENDING_REMINDERS_SQL, 'r.id', _reminder_notification),
+                   ('interview', UPCOMING_INTERVIEWS_SQL, 'i.id', _interview_notification)]
+        for source_kind, sql, id_column, build in sources:
+            if kind is not None and kind != source_kind:
+                continue
+            where, params = ('', ()) if source_id is None else (f'AND {id_column} = ?', (source_id,))
+            sent_sql = 'SELECT source_id, due_at FROM sent_notifications WHERE kind = ?'
+            sent_params = (source_kind,)
+            if source_id is not None:
+                sent_sql += ' AND source_id = ?'
+                sent_params += (source_id,)
+            sent = set(conn.execute(sent_sql, sent_params).fetchall())
+
+            found = False
+            for row in conn.execute(sql.format(where=where), params):
+                notification = build(row)
+                if notification is None or (notification['id'], notification['due_at']) in sent:
+                    continue
+                found = True
+                self._schedule(notification)
+            if source_id is not None and not found:
+                # Completed, deleted or already sent - drop whatever was scheduled
+                with self._condition:
+                    self._pending.pop((source_kind, source_id), None)
+
+    def _schedule(self, notification, due_ts=None):
+        key = (notification['kind'], notification['id'])
+        if due_ts is None:
+            due_ts = datetime.fromisoformat(notification['due_at']).timestamp()
+        with self._condition:
+            self._pending[key] = notification
+            heapq.heappush(self._heap, (due_ts, next(self._counter), key, notification))
+            # Only wake the thread if this is now the earliest thing to do
+            if self._heap[0][2] == key:
+                self._condition.notify()
+
+    def pending_count(self):
+        with self._condition:
+            return len(self._pending)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopping:
+                    # Drop anything that's been rescheduled or cancelled since it was pushed
+                    while self._heap and self._pending.get(self._heap[0][2]) is not self._heap[0][3]:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    delay = self._heap[0][0] - time.time()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                if self._stopping:
+                    return
+                _, _, key, notification = heapq.heappop(self._heap)
+                del self._pending[key]
+            # Delivering can be slow (SMTP, HTTP) - don't hold the lock for it
+            self._deliver(notification)
+
+    def _deliver(self, notification):
+        delivered = False
+        for sink in self.sinks:
+            try:
+                sink.send(notification)
+                delivered = True
+            except Exception:
+                logger.exception('Reminder sink %s failed', type(sink).__name__)
+
+        if not delivered:
+            self._schedule(notification, time.time() + RETRY_DELAY)
+            return
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.execute('INSERT OR IGNORE INTO sent_notifications (kind, source_id, due_at) VALUES (?, ?, ?)',
+                             (notification['kind'], notification['id'], notification['due_at']))
+        finally:
+            conn.close()
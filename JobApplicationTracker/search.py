@@ -0,0 +1,151 @@
+"""
+Full-text search over applications, interview feedback and reminders.
+
+Everything searchable goes into one FTS5 table, search_index, and triggers on
+the three source tables keep it in sync. The FTS rowid encodes where a row
+came from (source id * 4 + kind), so the triggers can update or delete their
+entry by rowid instead of scanning the index.
+"""
+
+import html
+import re
+
+# Kind codes that go in the low bits of the FTS rowid
+KINDS = {'application': 1, 'interview': 2, 'reminder': 3}
+KIND_NAMES = {code: name for name, code in KINDS.items()}
+
+# What goes in the title and body columns for each source table. NEW./OLD. get
+# filled in by the trigger, plain column names by the backfill.
+SOURCES = {
+    'application': {
+        'table': 'applications',
+        'application_id': '{p}id',
+        'title': "COALESCE({p}company, '') || ' ' || COALESCE({p}position, '')",
+        'body': ("COALESCE({p}location, '') || ' ' || COALESCE({p}recruiter_name, '') || ' ' || "
+                 "COALESCE({p}recruiter_email, '') || ' ' || COALESCE({p}salary_range, '') || ' ' || "
+                 "COALESCE({p}notes, '')"),
+    },
+    'interview': {
+        'table': 'interviews',
+        'application_id': '{p}application_id',
+        'title': "COALESCE({p}interview_type, '') || ' ' || COALESCE({p}interviewer_name, '')",
+        'body': "COALESCE({p}feedback, '') || ' ' || COALESCE({p}next_steps, '')",
+    },
+    'reminder': {
+        'table': 'reminders',
+        'application_id': '{p}application_id',
+        'title': "COALESCE({p}reminder_type, '')",
+        'body': "COALESCE({p}message, '')",
+    },
+}
+
+# Title matches count more than body matches
+SEARCH_SQL = '''
+    SELECT s.rowid, s.application_id, a.company, a.position, a.status,
+           snippet(search_index, -1, char(2), char(3), '...', 12) AS snippet,
+           bm25(search_index, 0, 0, 0, 5.0, 1.0) AS score
+    FROM search_index s
+    JOIN applications a ON a.id = s.application_id
+    WHERE search_index MATCH ?
+    ORDER BY score
+    LIMIT ?
+'''
+
+
+def _sql(kind, part, prefix=''):
+    return SOURCES[kind][part].format(p=prefix)
+
+
+def init_search(conn):
+    """Create the FTS table and its triggers, backfilling if it's new"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'"
+    ).fetchone()
+
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            kind UNINDEXED,
+            source_id UNINDEXED,
+            application_id UNINDEXED,
+            title,
+            body,
+            tokenize = 'porter unicode61'
+        )
+    ''')
+
+    for kind, source in SOURCES.items():
+        code = KINDS[kind]
+        insert = f'''
+            INSERT INTO search_index (rowid, kind, source_id, application_id, title, body)
+            VALUES (NEW.id * 4 + {code}, '{kind}', NEW.id, {_sql(kind, 'application_id', 'NEW.')},
+                    {_sql(kind, 'title', 'NEW.')}, {_sql(kind, 'body', 'NEW.')});
+        '''
+        delete = f'DELETE FROM search_index WHERE rowid = OLD.id * 4 + {code};'
+        table = source['table']
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS search_{table}_insert AFTER INSERT ON {table}
+            BEGIN {insert} END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS search_{table}_delete AFTER DELETE ON {table}
+            BEGIN {delete} END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS search_{table}_update AFTER UPDATE ON {table}
+            BEGIN {delete} {insert} END
+        ''')
+
+    if not exists:
+        rebuild_search(conn)
+
+
+def rebuild_search(conn):
+    """Re-index everything from the source tables"""
+    conn.execute('DELETE FROM search_index')
+    for kind, source in SOURCES.items():
+        conn.execute(f'''
+            INSERT INTO search_index (rowid, kind, source_id, application_id, title, body)
+            SELECT id * 4 + {KINDS[kind]}, '{kind}', id, {_sql(kind, 'application_id')},
+                   {_sql(kind, 'title')}, {_sql(kind, 'body')}
+            FROM {source['table']}
+        ''')
+
+
+def build_match_query(text):
+    """Turn what someone typed into an FTS5 query
+
+    Every word has to match (as a prefix, so 'eng' finds 'engineer'). Quoting
+    each word keeps FTS operators and stray punctuation from being a syntax error.
+    """
+    words = re.findall(r'\w+', text or '')
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _highlight(snippet):
+    # The snippet markers are control characters, so escape first, then mark
+    return html.escape(snippet or '').replace('\x02', '<mark>').replace('\x03', '</mark>')
+
+
+def search(conn, text, limit=20):
+    """Best matches first, as dicts with an HTML-safe snippet"""
+    query = build_match_query(text)
+    if not query:
+        return []
+    results = []
+    for row in conn.execute(SEARCH_SQL, (query, limit)):
+        results.append({
+            'kind': KIND_NAMES[row[0] % 4],
+            'id': row[0] // 4,
+            'application_id': row[1],
+            'company': row[2],
+            'position': row[3],
+            'status': row[4],
+            'snippet': _highlight(row[5]),
+            'score': round(row[6], 4),
+        })
+    return results
+
+
+def matching_application_ids_sql():
+    """Subquery for filtering applications by a search (one parameter: the match query)"""
+    return 'SELECT application_id FROM search_index WHERE search_index MATCH ?'
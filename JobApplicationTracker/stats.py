@@ -0,0 +1,153 @@
+"""
+Dashboard counters kept current by triggers.
+
+The dashboard used to GROUP BY status (twice - once for the page, once for
+the chart API) and group every application by month on each load. Now
+dashboard_stats holds the counts and triggers on applications, interviews
+and reminders adjust them as rows change, so both routes read every number
+they need with one query over a table that's only as big as the number of
+statuses + days with something applied for or scheduled.
+
+Rows are (kind, key, count):
+    status         status name         applications with that status
+    day            'YYYY-MM-DD'        applications by date_applied
+    interview_day  'YYYY-MM-DD'        interviews on that day
+    reminder_day   'YYYY-MM-DD'        open (not completed) reminders due that day
+
+The timeline ("last 6 months", by month), "upcoming" and "due" depend on
+today's date, so those are stored per day and summed over the right range
+when read.
+"""
+
+def _change(kind, key_sql, delta):
+    return f'''
+        INSERT INTO dashboard_stats (kind, key, count) VALUES ('{kind}', COALESCE({key_sql}, ''), {delta})
+        ON CONFLICT (kind, key) DO UPDATE SET count = count + excluded.count;
+    '''
+
+
+def _application(prefix, delta):
+    return (_change('status', f'{prefix}.status', delta) +
+            _change('day', f'date({prefix}.date_applied)', delta))
+
+
+def _interview(prefix, delta):
+    return _change('interview_day', f'date({prefix}.interview_date)', delta)
+
+
+def _reminder(prefix, delta):
+    return _change('reminder_day', f'date({prefix}.reminder_date)', delta)
+
+
+# (name, table, event, condition, body)
+TRIGGERS = [
+    ('stats_applications_insert', 'applications', 'INSERT', '', _application('NEW', 1)),
+    ('stats_applications_delete', 'applications', 'DELETE', '', _application('OLD', -1)),
+    ('stats_applications_update', 'applications', 'UPDATE OF status, date_applied', '',
+     _application('OLD', -1) + _application('NEW', 1)),
+    ('stats_interviews_insert', 'interviews', 'INSERT', '', _interview('NEW', 1)),
+    ('stats_interviews_delete', 'interviews', 'DELETE', '', _interview('OLD', -1)),
+    ('stats_interviews_update', 'interviews', 'UPDATE OF interview_date', '',
+     _interview('OLD', -1) + _interview('NEW', 1)),
+    # Completed reminders don't count, same as the dashboard query always did
+    ('stats_reminders_insert', 'reminders', 'INSERT', 'WHEN NEW.is_completed = FALSE', _reminder('NEW', 1)),
+    ('stats_reminders_delete', 'reminders', 'DELETE', 'WHEN OLD.is_completed = FALSE', _reminder('OLD', -1)),
+    ('stats_reminders_update_old', 'reminders', 'UPDATE OF reminder_date, is_completed',
+     'WHEN OLD.is_completed = FALSE', _reminder('OLD', -1)),
+    ('stats_reminders_update_new', 'reminders', 'UPDATE OF reminder_date, is_completed',
+     'WHEN NEW.is_completed = FALSE', _reminder('NEW', 1)),
+]
+
+# Everything the dashboard and /api/dashboard-data need, in one statement
+DASHBOARD_STATS_SQL = '''
+    SELECT kind, key, count FROM dashboard_stats
+    WHERE kind = 'status' AND count > 0
+    UNION ALL
+    SELECT 'month', substr(key, 1, 7), SUM(count) FROM dashboard_stats
+    WHERE kind = 'day' AND key >= date('now', '-6 months')
+    GROUP BY 2 HAVING SUM(count) > 0
+    UNION ALL
+    SELECT 'upcoming_interviews', NULL, COALESCE(SUM(count), 0) FROM dashboard_stats
+    WHERE kind = 'interview_day' AND key >= date('now')
+    UNION ALL
+    SELECT 'due_reminders', NULL, COALESCE(SUM(count), 0) FROM dashboard_stats
+    WHERE kind = 'reminder_day' AND key <= date('now', '+7 days')
+'''
+
+
+def init_stats(conn):
+    """Create the stats table and triggers, backfilling if the table is new"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dashboard_stats'"
+    ).fetchone()
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS dashboard_stats (
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (kind, key)
+        ) WITHOUT ROWID
+    ''')
+    for name, table, event, condition, body in TRIGGERS:
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {name}
+            AFTER {event} ON {table} {condition}
+            BEGIN {body} END
+        ''')
+
+    if not exists:
+        rebuild_stats(conn)
+
+
+def rebuild_stats(conn):
+    """Recount everything from scratch"""
+    conn.execute('DELETE FROM dashboard_stats')
+    conn.execute('''
+        INSERT INTO dashboard_stats (kind, key, count)
+        SELECT 'status', COALESCE(status, ''), COUNT(*) FROM applications GROUP BY 2
+        UNION ALL
+        SELECT 'day', COALESCE(date(date_applied), ''), COUNT(*) FROM applications GROUP BY 2
+        UNION ALL
+        SELECT 'interview_day', COALESCE(date(interview_date), ''), COUNT(*) FROM interviews GROUP BY 2
+        UNION ALL
+        SELECT 'reminder_day', COALESCE(date(reminder_date), ''), COUNT(*) FROM reminders
+        WHERE is_completed = FALSE GROUP BY 2
+    ''')
+
+
+def dashboard_stats(conn):
+    """All dashboard numbers from dashboard_stats in a single query
+
+    Returns {'total', 'status': [{'status', 'count'}] (biggest first),
+    'timeline': [{'month', 'count'}], 'upcoming_interviews', 'due_reminders'}.
+    """
+    stats = {'total': 0, 'status': [], 'timeline': [], 'upcoming_interviews': 0, 'due_reminders': 0}
+    for kind, key, count in conn.execute(DASHBOARD_STATS_SQL):
+        if kind == 'status':
+            stats['status'].append({'status': key, 'count': count})
+            stats['total'] += count
+        elif kind == 'month':
+            if key:  # '' is dates SQLite couldn't parse
+                stats['timeline'].append({'month': key, 'count': count})
+        else:
+            stats[kind] = count
+    stats['status'].sort(key=lambda s: -s['count'])
+    stats['timeline'].sort(key=lambda m: m['month'])
+    return stats
+
+
+def count_applications(conn, status=None):
+    """Exact application count (optionally for one status) without touching applications"""
+    if status is None:
+        row = conn.execute("SELECT COALESCE(SUM(count), 0) FROM dashboard_stats WHERE kind = 'status'").fetchone()
+    else:
+        row = conn.execute("SELECT count FROM dashboard_stats WHERE kind = 'status' AND key = ?",
+                           (status,)).fetchone()
+    return row[0] if row else 0
+
+
+def statuses(conn):
+    """Every status that has at least one application"""
+    return [row[0] for row in conn.execute(
+        "SELECT key FROM dashboard_stats WHERE kind = 'status' AND count > 0 ORDER BY key")]
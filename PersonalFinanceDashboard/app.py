@@ -10,26 +10,56 @@ Features:
 - Budget tracking
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, Response, stream_with_context
 import pandas as pd
+import numpy as np
+import io
+import base64
+import hashlib
 import json
+import logging
 import os
 from datetime import datetime, timedelta
 import sqlite3
 from werkzeug.utils import secure_filename
 import re
+import tempfile
+import threading
+import time
+import uuid
+
+import bank_profiles
+import budgets
+import categorizer
+from fingerprints import fingerprint_key, transaction_fingerprint
+import migrations
+import recategorize
+import rollups
+from response_cache import LRUCache, bump_data_version, get_data_version, versioned_response
 
 app = Flask(__name__)
 app.secret_key = 'dev-secret-change-in-production'
 app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['MAX_CONTENT_LENGTH'] = 256 * 1024 * 1024  # 256MB - uploads are streamed in chunks now
+app.config['UPLOAD_CHUNK_ROWS'] = 20000  # rows parsed/committed per chunk
+app.config['TRANSACTIONS_PAGE_SIZE'] = 100  # rows per page on /transactions
+app.config['TRANSACTIONS_MAX_PAGE_SIZE'] = 1000  # cap for ?limit= on /api/transactions
+app.config['RESPONSE_CACHE_ENTRIES'] = 128  # cached dashboard/chart responses (0 = ETags only)
+app.config['RESPONSE_CACHE_TTL'] = 300  # seconds
+
+DB_PATH = 'finance.db'
+
+logger = logging.getLogger('finance')
+
+# Rendered dashboard/chart responses, keyed on the data version - see response_cache.py
+response_cache = LRUCache(app.config['RESPONSE_CACHE_ENTRIES'], app.config['RESPONSE_CACHE_TTL'])
 
 # Create uploads directory
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 # Database setup
 def init_db():
-    conn = sqlite3.connect('finance.db')
+    conn = sqlite3.connect(DB_PATH)
     conn.execute('''
         CREATE TABLE IF NOT EXISTS transactions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -38,7 +68,8 @@ def init_db():
             amount REAL NOT NULL,
             category TEXT,
             account TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            fingerprint TEXT
         )
     ''')
     
@@ -68,64 +99,175 @@ def init_db():
         conn.execute('INSERT OR IGNORE INTO categories (name, keywords, color) VALUES (?, ?, ?)', 
                     (cat, keywords, color))
     
+    # Small key/value table for bookkeeping (e.g. when categories last changed)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS app_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('categories_version', 1)")
+    # Bumped whenever transactions change so cached dashboard responses know when they're stale
+    conn.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('data_version', 1)")
+    
+    # Bump the version whenever categories change so the cached categorizer gets rebuilt
+    # (data_version's triggers on transactions are a migration)
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS categories_version_{event.lower()}
+            AFTER {event} ON categories
+            BEGIN
+                UPDATE app_meta SET value = value + 1 WHERE key = 'categories_version';
+            END
+        ''')
+    
+    # Per day/category/sign totals for the dashboard, kept current by triggers
+    rollups.init_rollups(conn)
+    
     conn.commit()
+    
+    # Indexes, fingerprints, data_version triggers and any later schema changes - see migrations.py
+    migrations.migrate(conn)
     conn.close()
 
-def categorize_transaction(description, amount):
-    """Auto-categorize transaction based on description keywords"""
-    conn = sqlite3.connect('finance.db')
-    categories = conn.execute('SELECT name, keywords FROM categories').fetchall()
-    conn.close()
+# A date stamp at the end of an export's name - chase-4421_2024-01.csv and
+# chase-4421_2024-02.csv are the same account
+EXPORT_DATE_RE = re.compile(r'[\s._-]*\d{4}[-_]?\d{2}(?:[-_]?\d{2})?$')
+
+def account_for(filename):
+    """Account for a statement file: its name without the extension or a trailing date
+
+    It's part of the fingerprint, so the same purchase on two cards imported
+    together isn't taken for a re-upload, while next month's export of the
+    same card still skips the overlap.
+    """
+    stem = os.path.splitext(os.path.basename(filename or ''))[0]
+    return EXPORT_DATE_RE.sub('', stem).strip() or 'Uploaded'
+
+def categorize_transaction(description, amount, conn=None):
+    """Auto-categorize transaction based on description keywords
+
+    The keyword matcher lives in categorizer.py and is only rebuilt when the
+    categories table changes. Pass an open connection to skip opening a new one.
+    """
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            return categorizer.get_categorizer(conn, DB_PATH).categorize(description, amount)
+        finally:
+            conn.close()
+    return categorizer.get_categorizer(conn, DB_PATH).categorize(description, amount)
+
+def categorize_transactions(descriptions, amounts, conn=None):
+    """Categorize a whole column of descriptions/amounts in one call"""
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            return categorizer.get_categorizer(conn, DB_PATH).categorize_many(descriptions, amounts)
+        finally:
+            conn.close()
+    return categorizer.get_categorizer(conn, DB_PATH).categorize_many(descriptions, amounts)
+
+RECENT_TRANSACTIONS_SQL = '''
+    SELECT * FROM transactions 
+    ORDER BY date DESC, created_at DESC 
+    LIMIT 10
+'''
+
+CATEGORY_NAMES_SQL = 'SELECT DISTINCT name FROM categories ORDER BY name'
+
+def build_transactions_query(category_filter='', date_from='', date_to='', after=None, limit=500):
+    """SQL and params for the /transactions list
+
+    Pages are keyset-paginated on (date, created_at, id): after is the key of
+    the last row on the previous page, so every page is an index range read
+    no matter how deep into the history it is.
+    """
+    query = "SELECT * FROM transactions WHERE 1=1"
+    params = []
     
-    description_lower = description.lower()
+    if category_filter:
+        query += " AND category = ?"
+        params.append(category_filter)
     
-    # TODO: make this smarter, maybe use ML later?
-    # Income detection - this is pretty basic but works for now
-    if amount > 0:
-        if any(word in description_lower for word in ['salary', 'paycheck', 'deposit', 'transfer']):
-            return 'Income'
+    if date_from:
+        query += " AND date >= ?"
+        params.append(date_from)
     
-    # Expense categorization - just using simple keyword matching
-    for cat_name, keywords in categories:
-        if keywords:
-            keyword_list = [k.strip() for k in keywords.split(',')]
-            if any(keyword in description_lower for keyword in keyword_list):
-                return cat_name
+    if date_to:
+        query += " AND date <= ?"
+        params.append(date_to)
+    
+    if after:
+        query += " AND (date, created_at, id) < (?, ?, ?)"
+        params.extend(after)
     
-    # Default fallback - could be smarter about this
-    return 'Other'
+    query += " ORDER BY date DESC, created_at DESC, id DESC LIMIT ?"
+    params.append(limit)
+    return query, params
+
+def encode_cursor(row):
+    """Opaque page cursor from the last row of a page"""
+    key = json.dumps([row['date'], row['created_at'], row['id']])
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """(date, created_at, id) from a cursor, or None if there isn't a valid one"""
+    if not cursor:
+        return None
+    try:
+        date, created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(date), str(created_at), int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+def route_queries():
+    """Every query the routes run, as (name, sql, params) for the query plan check"""
+    queries = [
+        ('dashboard recent', RECENT_TRANSACTIONS_SQL, ()),
+        ('dashboard summary', rollups.SUMMARY_SQL, ('-30 days',)),
+        ('dashboard categories', rollups.CATEGORY_SPENDING_SQL, ('-30 days',)),
+        ('chart monthly', rollups.MONTHLY_SQL, ('-12 months',)),
+        ('transactions categories', CATEGORY_NAMES_SQL, ()),
+        ('budget status', budgets.STATUS_SQL, ('2024-06',)),
+    ]
+    # Each combination of the /transactions filters
+    for category in ('', 'Groceries'):
+        for date_from in ('', '2024-01-01'):
+            for date_to in ('', '2024-12-31'):
+                for after in (None, ('2024-06-01', '2024-06-01 00:00:00', 1)):
+                    query, params = build_transactions_query(category, date_from, date_to, after)
+                    name = (f"transactions category={category!r} from={date_from!r} "
+                            f"to={date_to!r} paged={after is not None}")
+                    queries.append((name, query, params))
+    return queries
+
+def current_data_version():
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        return get_data_version(conn)
+    finally:
+        conn.close()
 
 @app.route('/')
+@versioned_response(current_data_version, response_cache)
 def dashboard():
     """Main dashboard with overview stats"""
-    conn = sqlite3.connect('finance.db')
+    conn = sqlite3.connect(DB_PATH)
     
     # Get recent transactions
-    recent = pd.read_sql('''
-        SELECT * FROM transactions 
-        ORDER BY date DESC, created_at DESC 
-        LIMIT 10
-    ''', conn)
-    
-    # Get summary stats
-    total_income = conn.execute('''
-        SELECT COALESCE(SUM(amount), 0) FROM transactions 
-        WHERE amount > 0 AND date >= date('now', '-30 days')
-    ''').fetchone()[0]
-    
-    total_expenses = conn.execute('''
-        SELECT COALESCE(SUM(amount), 0) FROM transactions 
-        WHERE amount < 0 AND date >= date('now', '-30 days')
-    ''').fetchone()[0]
+    recent = pd.read_sql(RECENT_TRANSACTIONS_SQL, conn)
+    
+    # Get summary stats - read from the daily rollups instead of scanning transactions
+    total_income, total_expenses = rollups.summary_since(conn, '-30 days')
     
     # Category breakdown
-    category_data = pd.read_sql('''
-        SELECT category, SUM(ABS(amount)) as total
-        FROM transactions 
-        WHERE amount < 0 AND date >= date('now', '-30 days')
-        GROUP BY category
-        ORDER BY total DESC
-    ''', conn)
+    category_data = [{'category': row['category'], 'total': row['amount']}
+                     for row in rollups.category_spending_since(conn, '-30 days')]
+    
+    # Budget vs actual for this month - one read over the budgets table
+    budget_data = budgets.budget_status(conn, current_month())
+    categories = [row[0] for row in conn.execute(CATEGORY_NAMES_SQL)]
     
     conn.close()
     
@@ -134,7 +276,9 @@ def dashboard():
                          total_income=total_income,
                          total_expenses=abs(total_expenses),
                          net_income=total_income + total_expenses,
-                         category_data=category_data.to_dict('records'))
+                         category_data=category_data,
+                         budgets=budget_data,
+                         categories=categories)
 
 @app.route('/upload')
 def upload_page():
@@ -148,35 +292,181 @@ def upload_file():
         flash('No file selected', 'error')
         return redirect(request.url)
     
-    file = request.files['file']
-    if file.filename == '':
+    files = [f for f in request.files.getlist('file') if f.filename]
+    if not files:
         flash('No file selected', 'error')
         return redirect(request.url)
     
+    if len(files) > 1:
+        return upload_many(files)
+    
+    file = files[0]
     if file and file.filename.lower().endswith('.csv'):
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        # The upload page sends its own id so it can poll /upload/status while we work
+        upload_id = request.form.get('upload_id') or uuid.uuid4().hex
+        job = start_upload_job(upload_id, secure_filename(file.filename), request.content_length)
         
         try:
-            # Process the CSV
-            df = pd.read_csv(filepath)
-            processed_count = process_transactions(df)
-            flash(f'Successfully processed {processed_count} transactions', 'success')
+            # Stream the CSV in chunks instead of loading it all at once
+            result = ingest_csv_stream(file.stream, job=job, account=account_for(file.filename))
+            finish_upload_job(job, 'done')
+            flash(f"Successfully processed {result['new']} new transactions "
+                  f"({result['skipped']} already uploaded)", 'success')
             return redirect(url_for('dashboard'))
             
         except Exception as e:
+            finish_upload_job(job, 'error', str(e))
             flash(f'Error processing file: {str(e)}', 'error')
             return redirect(request.url)
     
     flash('Please upload a CSV file', 'error')
     return redirect(request.url)
 
-def process_transactions(df):
-    """Process uploaded CSV and insert transactions"""
-    conn = sqlite3.connect('finance.db')
-    count = 0
+def upload_many(files):
+    """Several statements at once - parsed in parallel by import_statements"""
+    from import_statements import import_files  # imports this module, so not at the top
+    
+    if not all(f.filename.lower().endswith('.csv') for f in files):
+        flash('Please upload CSV files only', 'error')
+        return redirect(request.url)
     
+    upload_id = request.form.get('upload_id') or uuid.uuid4().hex
+    job = start_upload_job(upload_id, f'{len(files)} files', request.content_length)
+    update_upload_job(job, files_total=len(files), files_done=0)
+    
+    # The worker processes need real files to read
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = []
+        accounts = {}
+        for i, file in enumerate(files):
+            path = os.path.join(tmpdir, f'{i}_{secure_filename(file.filename)}')
+            file.save(path)
+            paths.append(path)
+            accounts[path] = account_for(file.filename)
+        
+        def progress(path, result):
+            update_upload_job(job,
+                              files_done=job['files_done'] + 1,
+                              processed=job['processed'] + result.get('new', 0),
+                              skipped=job['skipped'] + result.get('skipped', 0),
+                              rejected=job['rejected'] + result.get('rejected', 0))
+        
+        try:
+            totals = import_files(paths, progress=progress, accounts=accounts)
+        except Exception as e:
+            finish_upload_job(job, 'error', str(e))
+            flash(f'Error processing files: {str(e)}', 'error')
+            return redirect(request.url)
+    
+    finish_upload_job(job, 'done')
+    message = (f"Successfully processed {totals['new']} new transactions from {totals['files']} files "
+               f"({totals['skipped']} already uploaded)")
+    if totals['failed']:
+        flash(f"{totals['failed']} files could not be read", 'error')
+    flash(message, 'success')
+    return redirect(url_for('dashboard'))
+
+@app.route('/upload/status/<upload_id>')
+def upload_status(upload_id):
+    """Progress of a running (or recently finished) upload, polled by the upload page"""
+    with _upload_jobs_lock:
+        job = _upload_jobs.get(upload_id)
+        if job is None:
+            return jsonify({'id': upload_id, 'status': 'pending'}), 404
+        return jsonify(dict(job))
+
+# Upload progress - just kept in memory, it only needs to live as long as the import
+_upload_jobs = {}
+_upload_jobs_lock = threading.Lock()
+UPLOAD_JOB_TTL = 15 * 60  # forget finished jobs after 15 minutes
+
+def start_upload_job(upload_id, filename, total_bytes):
+    now = time.time()
+    job = {
+        'id': upload_id,
+        'filename': filename,
+        'status': 'processing',
+        'bytes_read': 0,
+        'total_bytes': total_bytes or 0,
+        'rows_read': 0,
+        'processed': 0,
+        'skipped': 0,
+        'rejected': 0,
+        'chunks': 0,
+        'error': None,
+        'started_at': now,
+        'finished_at': None,
+    }
+    with _upload_jobs_lock:
+        # Drop old finished jobs so this doesn't grow forever
+        for key in [k for k, j in _upload_jobs.items()
+                    if j['finished_at'] and now - j['finished_at'] > UPLOAD_JOB_TTL]:
+            del _upload_jobs[key]
+        _upload_jobs[upload_id] = job
+    return job
+
+def update_upload_job(job, **changes):
+    if job is None:
+        return
+    with _upload_jobs_lock:
+        job.update(changes)
+
+def finish_upload_job(job, status, error=None):
+    update_upload_job(job, status=status, error=error, finished_at=time.time())
+
+class CountingReader(io.RawIOBase):
+    """Wraps the upload stream so we know how many bytes have been read"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes_read = 0
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        data = self.stream.read(len(buffer))
+        n = len(data)
+        buffer[:n] = data
+        self.bytes_read += n
+        return n
+
+def ingest_csv_stream(stream, chunk_rows=None, job=None, account='Uploaded'):
+    """Parse, categorize and commit a CSV stream one chunk at a time
+
+    Only one chunk of rows is ever held in memory, so big exports don't blow
+    up the request. Each chunk is committed before the next one is read.
+    """
+    chunk_rows = chunk_rows or app.config['UPLOAD_CHUNK_ROWS']
+    reader = CountingReader(stream)
+    plan = None
+    seen = {}  # repeat counts for fingerprints, shared by all chunks
+    result = {'new': 0, 'skipped': 0, 'rejected': 0}
+    
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        for chunk in pd.read_csv(io.BufferedReader(reader), chunksize=chunk_rows):
+            if plan is None:
+                # Same columns in every chunk, so only detect the format once
+                plan = get_parse_plan(chunk)
+            new, skipped, rejects = insert_transactions(conn, chunk, plan, seen=seen, account=account)
+            result['new'] += new
+            result['skipped'] += skipped
+            result['rejected'] += len(rejects)
+            if job is not None:
+                update_upload_job(job,
+                                  bytes_read=reader.bytes_read,
+                                  rows_read=job['rows_read'] + len(chunk),
+                                  processed=result['new'],
+                                  skipped=result['skipped'],
+                                  rejected=result['rejected'],
+                                  chunks=job['chunks'] + 1)
+    finally:
+        conn.close()
+    return result
+
+def find_columns(df):
+    """Figure out which columns hold the date, description and amount"""
     # This part was tricky - different banks use different column names
     # Had to look up a bunch of bank CSV formats online
     possible_date_cols = ['date', 'Date', 'Transaction Date', 'Posted Date']
@@ -204,6 +494,171 @@ def process_transactions(df):
         amount_col = amount_col or cols[2]
         print(f"Warning: Had to guess columns - using {date_col}, {desc_col}, {amount_col}")  # Debug print
     
+    return date_col, desc_col, amount_col
+
+def get_parse_plan(df):
+    """How to read an upload - a known bank profile if the header matches one
+
+    See bank_profiles.py. Unknown layouts fall back to the old column guessing.
+    """
+    plan = bank_profiles.detect_plan(df.columns)
+    if plan is None:
+        date_col, desc_col, amount_col = find_columns(df)
+        plan = bank_profiles.ParsePlan('Guessed', date_col, desc_col, amount_col,
+                                       None, None, None, False)
+    return plan
+
+def parse_dates(values, date_format=None):
+    """Parse a whole date column to YYYY-MM-DD strings (NaN where it doesn't parse)"""
+    values = values.astype(str)
+    if date_format:
+        # Known format from the bank profile - no guessing at all
+        dates = pd.to_datetime(values, errors='coerce', format=date_format)
+    else:
+        # Most exports use one format throughout, so let pandas infer it once
+        dates = pd.to_datetime(values, errors='coerce')
+    missing = dates.isna() & ~values.isin(['nan', 'NaT', 'None', ''])
+    if missing.any():
+        # Mixed formats - fall back to parsing the leftovers one by one
+        dates[missing] = pd.to_datetime(values[missing], errors='coerce', format='mixed')
+    return dates.dt.strftime('%Y-%m-%d')
+
+def parse_amounts(values):
+    """Clean up a whole amount column - currency symbols, commas, (negatives)"""
+    # Bank CSVs are weird with this stuff
+    amounts = (values.astype(str)
+               .str.replace('$', '', regex=False)
+               .str.replace(',', '', regex=False)
+               .str.strip())
+    # Some banks put negative amounts in parentheses for some reason
+    parens = amounts.str.startswith('(') & amounts.str.endswith(')')
+    amounts[parens] = '-' + amounts[parens].str[1:-1]
+    return pd.to_numeric(amounts, errors='coerce')
+
+def prepare_transactions(df, plan):
+    """Vectorized clean-up of an uploaded statement
+
+    Returns (clean, rejects) where clean has date/description/amount columns
+    and rejects is a list of (row index, reason) for rows that got dropped.
+    """
+    if plan.amount_col:
+        amounts = parse_amounts(df[plan.amount_col])
+    else:
+        # Separate Debit/Credit columns - whichever one is filled in
+        debits = parse_amounts(df[plan.debit_col]).abs()
+        credits = parse_amounts(df[plan.credit_col]).abs()
+        amounts = credits.fillna(0) - debits.fillna(0)
+        amounts[debits.isna() & credits.isna()] = np.nan
+    if plan.negate:
+        amounts = -amounts
+    
+    clean = pd.DataFrame({
+        'date': parse_dates(df[plan.date_col], plan.date_format),
+        'description': df[plan.desc_col].astype(str).str.strip(),
+        'amount': amounts,
+    }, index=df.index)
+    
+    bad_date = clean['date'].isna()
+    bad_amount = ~bad_date & ~np.isfinite(clean['amount'])
+    rejects = [(idx, f"could not parse date {df.at[idx, plan.date_col]!r}") for idx in df.index[bad_date]]
+    amount_cols = [plan.amount_col] if plan.amount_col else [plan.debit_col, plan.credit_col]
+    rejects += [(idx, "could not parse amount " + '/'.join(repr(df.at[idx, c]) for c in amount_cols))
+                for idx in df.index[bad_amount]]
+    rejects.sort(key=lambda r: r[0])
+    
+    return clean[~(bad_date | bad_amount)], rejects
+
+def process_transactions(df, bulk=True):
+    """Process uploaded CSV and insert transactions
+
+    The bulk mode parses the whole frame with column operations and writes it
+    with one executemany in a single transaction. bulk=False keeps the old
+    row-by-row loop around for comparison.
+
+    Rows that were already uploaded before (same fingerprint) are skipped.
+    Returns a dict with new/skipped/rejected counts.
+    """
+    if not bulk:
+        return process_transactions_rowwise(df, *find_columns(df))
+    
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        new, skipped, rejects = insert_transactions(conn, df, get_parse_plan(df))
+    finally:
+        conn.close()
+    return {'new': new, 'skipped': skipped, 'rejected': len(rejects)}
+
+def insert_transactions(conn, df, plan, seen=None, account='Uploaded'):
+    """Clean, categorize and insert a frame of rows in one transaction
+
+    seen carries the repeat counts between chunks of the same upload so the
+    occurrence numbers in the fingerprints keep counting up across chunks.
+    Returns (new count, skipped count, rejects).
+    """
+    matcher = categorizer.get_categorizer(conn, DB_PATH)
+    rows, rejects = build_transaction_rows(df, plan, matcher, seen, account)
+    log_rejects(rejects)
+    new = write_transaction_rows(conn, rows)
+    return new, len(rows) - new, rejects
+
+def log_rejects(rejects, source='upload'):
+    """One warning for the rows that couldn't be read, the reasons at debug level"""
+    if not rejects:
+        return
+    logger.warning("%s: skipped %d rows that couldn't be parsed", source, len(rejects))
+    if logger.isEnabledFor(logging.DEBUG):
+        for idx, reason in rejects:
+            logger.debug("%s row %s: %s", source, idx, reason)
+
+def build_transaction_rows(df, plan, matcher, seen=None, account='Uploaded'):
+    """Clean + categorize a frame into rows ready for write_transaction_rows
+
+    Doesn't touch the database, so it can run in a worker process.
+    Returns (rows, rejects).
+    """
+    clean, rejects = prepare_transactions(df, plan)
+    
+    # Number the repeats of each date/description/amount/account within this upload
+    if seen is None:
+        seen = {}
+    # (same key as fingerprint_key, just built a column at a time)
+    keys = (clean['date'] + '|' + clean['description'] + '|'
+            + clean['amount'].map('{:.2f}'.format) + '|' + account)
+    occurrences = keys.groupby(keys).cumcount() + keys.map(seen).fillna(0).astype(int)
+    for key, n in keys.value_counts().items():
+        seen[key] = seen.get(key, 0) + n
+    fingerprints = [hashlib.sha1(f"{key}|{occ}".encode('utf-8')).hexdigest()
+                    for key, occ in zip(keys, occurrences)]
+    
+    categories = matcher.categorize_many(clean['description'], clean['amount'])
+    rows = list(zip(clean['date'], clean['description'], clean['amount'].tolist(),
+                    categories, [account] * len(clean), fingerprints))
+    return rows, rejects
+
+def write_transaction_rows(conn, rows):
+    """Insert prepared rows in one transaction, returns how many were new"""
+    with conn:  # one transaction for the whole batch
+        # The unique fingerprint index does the duplicate check - one index probe per row
+        # (rowcount only counts rows actually inserted, not ignored ones or trigger writes)
+        cursor = conn.executemany('''
+            INSERT OR IGNORE INTO transactions (date, description, amount, category, account, fingerprint)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', rows)
+        new = max(cursor.rowcount, 0)
+    return new
+
+def process_transactions_rowwise(df, date_col, desc_col, amount_col):
+    """Original one-row-at-a-time ingest loop"""
+    conn = sqlite3.connect(DB_PATH)
+    count = 0
+    
+    skipped = 0
+    rejected = 0
+    seen = {}
+    
+    # Grab the compiled keyword matcher once instead of per row
+    matcher = categorizer.get_categorizer(conn, DB_PATH)
+    
     for _, row in df.iterrows():
         try:
             # Parse date
@@ -211,6 +666,7 @@ def process_transactions(df):
             try:
                 date_obj = pd.to_datetime(date_str).strftime('%Y-%m-%d')
             except:
+                rejected += 1
                 continue
             
             # Parse description
@@ -227,111 +683,224 @@ def process_transactions(df):
                 amount = float(amount_str)
             except:
                 # Skip rows where amount parsing fails - probably header or bad data
+                rejected += 1
                 continue
             
-            # Auto-categorize using the function I wrote above
-            category = categorize_transaction(description, amount)
+            # Auto-categorize using the cached keyword matcher
+            category = matcher.categorize(description, amount)
+            
+            # Number repeats so genuine duplicates within the file still get in
+            key = fingerprint_key(date_obj, description, amount, 'Uploaded')
+            occurrence = seen.get(key, 0)
+            seen[key] = occurrence + 1
+            fingerprint = transaction_fingerprint(date_obj, description, amount, 'Uploaded', occurrence)
             
             # Insert transaction - using parameterized queries for safety
-            conn.execute('''
-                INSERT INTO transactions (date, description, amount, category, account)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (date_obj, description, amount, category, 'Uploaded'))
+            cursor = conn.execute('''
+                INSERT OR IGNORE INTO transactions (date, description, amount, category, account, fingerprint)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (date_obj, description, amount, category, 'Uploaded', fingerprint))
             
-            count += 1
+            if cursor.rowcount:
+                count += 1
+            else:
+                skipped += 1
             
         except Exception as e:
             # Skip problematic rows but keep going
             print(f"Error processing row: {e}")  # Debug - should probably log this properly
+            rejected += 1
             continue
     
     conn.commit()
     conn.close()
-    return count
+    return {'new': count, 'skipped': skipped, 'rejected': rejected}
 
 @app.route('/api/chart-data')
+@versioned_response(current_data_version, response_cache)
 def chart_data():
     """API endpoint for chart data"""
-    conn = sqlite3.connect('finance.db')
-    
-    # Monthly spending trend
-    monthly_data = pd.read_sql('''
-        SELECT 
-            strftime('%Y-%m', date) as month,
-            SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as expenses,
-            SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as income
-        FROM transactions
-        WHERE date >= date('now', '-12 months')
-        GROUP BY month
-        ORDER BY month
-    ''', conn)
-    
-    # Category breakdown (last 30 days)
-    category_data = pd.read_sql('''
-        SELECT 
-            c.name as category,
-            c.color,
-            SUM(ABS(t.amount)) as amount
-        FROM transactions t
-        LEFT JOIN categories c ON t.category = c.name
-        WHERE t.amount < 0 AND t.date >= date('now', '-30 days')
-        GROUP BY t.category, c.color
-        ORDER BY amount DESC
-    ''', conn)
+    conn = sqlite3.connect(DB_PATH)
+    
+    # Monthly spending trend and category breakdown (last 30 days), both from
+    # the rollup table so this doesn't depend on how many transactions there are
+    monthly_data = rollups.monthly_totals_since(conn, '-12 months')
+    category_data = rollups.category_spending_since(conn, '-30 days')
     
     conn.close()
     
     return jsonify({
-        'monthly': monthly_data.to_dict('records'),
-        'categories': category_data.to_dict('records')
+        'monthly': monthly_data,
+        'categories': category_data
     })
 
+def current_month():
+    # UTC, same as date('now') in SQLite
+    return time.strftime('%Y-%m', time.gmtime())
+
+@app.route('/api/budgets')
+def get_budgets():
+    """Budget vs actual per category (?month=YYYY-MM, defaults to this month)"""
+    month = request.args.get('month') or current_month()
+    if not re.fullmatch(r'\d{4}-\d{2}', month):
+        return jsonify({'error': 'month must look like YYYY-MM'}), 400
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        status = budgets.budget_status(conn, month)
+    finally:
+        conn.close()
+    return jsonify({'month': month, 'budgets': status})
+
+@app.route('/api/budgets', methods=['POST'])
+def save_budget():
+    """Set a category's monthly budget - accepts both the dashboard form and JSON"""
+    data = request.form if request.form else (request.get_json(silent=True) or {})
+    category = (data.get('category') or '').strip()
+    try:
+        amount = float(data.get('amount'))
+    except (TypeError, ValueError):
+        amount = None
+    
+    error = None
+    if not category or amount is None or amount <= 0:
+        error = 'Category and a positive amount are required'
+    
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        if not error and not conn.execute('SELECT 1 FROM categories WHERE name = ?', (category,)).fetchone():
+            error = f'Unknown category: {category}'
+        if not error:
+            with conn:
+                budgets.set_budget(conn, category, amount)
+                bump_data_version(conn)  # the dashboard shows budgets, so it's stale now
+            status = budgets.budget_status(conn, current_month())
+    finally:
+        conn.close()
+    
+    if request.form:
+        flash(error or f'Budget for {category} set to ${amount:.2f}/month', 'error' if error else 'success')
+        return redirect(url_for('dashboard'))
+    if error:
+        return jsonify({'error': error}), 400
+    return jsonify({'month': current_month(), 'budgets': status})
+
+@app.route('/api/budgets/<path:category>', methods=['DELETE'])
+def remove_budget(category):
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        with conn:
+            deleted = budgets.delete_budget(conn, category)
+            if deleted:
+                bump_data_version(conn)
+    finally:
+        conn.close()
+    if not deleted:
+        return jsonify({'error': 'No budget for that category'}), 404
+    return jsonify({'message': 'deleted', 'category': category})
+
+@app.route('/api/recategorize', methods=['POST'])
+def recategorize_transactions():
+    """Re-apply the current category keywords to stored transactions
+
+    Pass dry_run=1 (query string, form or JSON) to get the diff without writing it.
+    """
+    data = request.form if request.form else (request.get_json(silent=True) or {})
+    dry_run = str(request.args.get('dry_run', data.get('dry_run', ''))).lower() in ('1', 'true', 'yes', 'on')
+    
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        result = recategorize.recategorize(conn, dry_run=dry_run)
+    finally:
+        conn.close()
+    return jsonify(result)
+
 @app.route('/transactions')
 def transactions():
-    """View all transactions with filtering"""
-    conn = sqlite3.connect('finance.db')
+    """View all transactions with filtering (one page at a time)"""
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
     
     # Get filter parameters
     category_filter = request.args.get('category', '')
     date_from = request.args.get('date_from', '')
     date_to = request.args.get('date_to', '')
+    cursor = request.args.get('cursor', '')
+    page_size = app.config['TRANSACTIONS_PAGE_SIZE']
     
-    # Build query
-    query = "SELECT * FROM transactions WHERE 1=1"
-    params = []
-    
-    if category_filter:
-        query += " AND category = ?"
-        params.append(category_filter)
-    
-    if date_from:
-        query += " AND date >= ?"
-        params.append(date_from)
+    # Build query - one extra row tells us whether there's a next page
+    query, params = build_transactions_query(category_filter, date_from, date_to,
+                                             decode_cursor(cursor), page_size + 1)
     
-    if date_to:
-        query += " AND date <= ?"
-        params.append(date_to)
-    
-    query += " ORDER BY date DESC, created_at DESC LIMIT 500"
-    
-    transactions_df = pd.read_sql(query, conn, params=params)
+    rows = conn.execute(query, params).fetchall()
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    rows = rows[:page_size]
     
     # Get available categories for filter
-    categories = conn.execute('SELECT DISTINCT name FROM categories ORDER BY name').fetchall()
+    categories = conn.execute(CATEGORY_NAMES_SQL).fetchall()
     categories = [cat[0] for cat in categories]
     
     conn.close()
     
+    filters = {
+        'category': category_filter,
+        'date_from': date_from,
+        'date_to': date_to
+    }
+    
     return render_template('transactions.html', 
-                         transactions=transactions_df.to_dict('records'),
+                         transactions=rows,
                          categories=categories,
-                         filters={
-                             'category': category_filter,
-                             'date_from': date_from,
-                             'date_to': date_to
-                         })
+                         filters=filters,
+                         is_first_page=not decode_cursor(cursor),
+                         first_page_url=url_for('transactions', **filters),
+                         next_page_url=url_for('transactions', cursor=next_cursor, **filters)
+                                       if next_cursor else None)
+
+@app.route('/api/transactions')
+def api_transactions():
+    """Transactions as JSON, keyset-paginated
+
+    Query params: category, date_from, date_to, limit, cursor (next_cursor from
+    the previous page). Rows are streamed straight from the sqlite cursor.
+    """
+    cursor = request.args.get('cursor', '')
+    after = decode_cursor(cursor)
+    if cursor and after is None:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    try:
+        limit = int(request.args.get('limit', app.config['TRANSACTIONS_PAGE_SIZE']))
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    limit = max(1, min(limit, app.config['TRANSACTIONS_MAX_PAGE_SIZE']))
+    
+    query, params = build_transactions_query(request.args.get('category', ''),
+                                             request.args.get('date_from', ''),
+                                             request.args.get('date_to', ''),
+                                             after, limit + 1)
+    
+    def generate():
+        conn = sqlite3.connect(DB_PATH)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield '{"transactions": ['
+            last = None
+            next_cursor = None
+            for count, row in enumerate(conn.execute(query, params)):
+                if count == limit:
+                    # The extra row - there's another page after this one
+                    next_cursor = encode_cursor(last)
+                    break
+                yield (',' if count else '') + json.dumps(dict(row))
+                last = row
+            yield '], "next_cursor": ' + json.dumps(next_cursor) + '}'
+        finally:
+            conn.close()
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
     init_db()
     print("Starting Personal Finance Dashboard...")  # Just to see it's running
     app.run(debug=True, port=5001)  # Using 5001 to avoid conflicts with other projects
@@ -0,0 +1,108 @@
+"""
+Bank export formats.
+
+Every bank names its columns differently, writes dates its own way and some
+of them split the amount into separate Debit/Credit columns (or show charges
+as positive numbers). A profile describes one of those formats, and
+detect_plan() picks the profile that matches an upload's header row.
+
+Detection is cached on a fingerprint of the header row, so the second upload
+from the same bank skips it entirely - and because the profile knows the date
+format, dates get parsed with an explicit format instead of pandas guessing.
+"""
+
+import hashlib
+import threading
+from collections import namedtuple
+
+# Column names are matched case-insensitively. Either amount or debit+credit is set.
+# negate flips the sign for banks that show charges as positive amounts.
+# signature lists extra columns that have to be there for the profile to match.
+BankProfile = namedtuple('BankProfile', [
+    'name', 'date', 'description', 'amount', 'debit', 'credit', 'date_format', 'negate', 'signature',
+], defaults=(None, None, None, None, False, ()))
+
+# What ingest actually uses - the profile resolved against the real column names
+ParsePlan = namedtuple('ParsePlan', [
+    'profile', 'date_col', 'desc_col', 'amount_col', 'debit_col', 'credit_col', 'date_format', 'negate',
+])
+
+PROFILES = [
+    BankProfile('Chase Checking', 'Posting Date', 'Description', amount='Amount',
+                date_format='%m/%d/%Y', signature=('Details', 'Balance')),
+    BankProfile('Chase Credit Card', 'Transaction Date', 'Description', amount='Amount',
+                date_format='%m/%d/%Y', signature=('Post Date', 'Category', 'Type')),
+    BankProfile('Bank of America', 'Date', 'Description', amount='Amount',
+                date_format='%m/%d/%Y', signature=('Running Bal.',)),
+    BankProfile('Capital One', 'Transaction Date', 'Description', debit='Debit', credit='Credit',
+                date_format='%Y-%m-%d', signature=('Posted Date', 'Card No.')),
+    BankProfile('American Express', 'Date', 'Description', amount='Amount',
+                date_format='%m/%d/%Y', negate=True, signature=('Card Member',)),
+    BankProfile('Generic Debit/Credit', 'Date', 'Description', debit='Debit', credit='Credit'),
+    # Same layout as sample_data.csv
+    BankProfile('Generic', 'Date', 'Description', amount='Amount'),
+]
+
+_lock = threading.Lock()
+_plan_cache = {}  # header fingerprint -> matching BankProfile (or None if nothing matched)
+
+
+def register_profile(profile):
+    """Add a custom profile (wins over built-in ones needing the same number of columns)"""
+    with _lock:
+        PROFILES.insert(0, profile)
+        _plan_cache.clear()
+
+
+def header_fingerprint(columns):
+    normalized = '|'.join(str(c).strip().lower() for c in columns)
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+def _required(profile):
+    cols = [profile.date, profile.description, profile.amount, profile.debit, profile.credit]
+    return [c for c in cols if c] + list(profile.signature)
+
+
+def _resolve(profile, columns):
+    """ParsePlan for a profile against actual column names, None if it doesn't fit"""
+    by_name = {str(c).strip().lower(): c for c in columns}
+    if not all(c.lower() in by_name for c in _required(profile)):
+        return None
+    lookup = lambda c: by_name[c.lower()] if c else None
+    return ParsePlan(profile.name, lookup(profile.date), lookup(profile.description),
+                     lookup(profile.amount), lookup(profile.debit), lookup(profile.credit),
+                     profile.date_format, profile.negate)
+
+
+def detect_plan(columns):
+    """Parse plan for an upload's header row, or None if no profile matches
+
+    The most specific matching profile wins (the one that needs the most columns).
+    """
+    fingerprint = header_fingerprint(columns)
+    with _lock:
+        cached = _plan_cache.get(fingerprint, False)
+    if cached is None:
+        return None
+    if cached:
+        # The fingerprint ignores case and spacing, so map the profile onto this
+        # upload's actual column names ('amount' vs 'Amount') rather than the first one's
+        return _resolve(cached, columns)
+
+    best = None
+    for profile in sorted(PROFILES, key=lambda p: -len(_required(p))):
+        best = _resolve(profile, columns)
+        if best is not None:
+            with _lock:
+                _plan_cache[fingerprint] = profile
+            return best
+
+    with _lock:
+        _plan_cache[fingerprint] = None
+    return None
+
+
+def clear_cache():
+    with _lock:
+        _plan_cache.clear()
@@ -0,0 +1,298 @@
+"""
+Synthetic load benchmark for the finance dashboard.
+
+Generates bank statement CSVs (deterministic for a given seed and end date)
+in a few of the formats from bank_profiles.py, ingests them into a scratch
+database and measures:
+
+- upload/ingest throughput (rows/sec through ingest_csv_stream)
+- categorize_transaction calls/sec (and categorize_many for comparison)
+- p50/p99 latency of /, /transactions and /api/chart-data via the test client
+
+The response cache is switched off while timing the endpoints, so every
+request actually runs the view. Results go to a JSON file; pass --compare
+with an older results file to see what got faster or slower.
+
+Usage:
+    python benchmark.py --rows 100000
+    python benchmark.py --rows 1000000 --formats generic,chase --output after.json --compare before.json
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import app as finance_app
+
+# A mix of merchants that hit each category plus some that don't match anything
+MERCHANTS = [
+    ('KROGER', -1), ('WALMART SUPERCENTER', -1), ('TARGET', -1), ('WHOLE FOODS MARKET', -1),
+    ('SHELL OIL', -1), ('UBER TRIP', -1), ('LYFT RIDE', -1), ('METRO TRANSIT', -1),
+    ('STARBUCKS', -1), ('MCDONALDS', -1), ('PIZZA HUT', -1), ('CORNER CAFE', -1),
+    ('NETFLIX.COM', -1), ('SPOTIFY USA', -1), ('AMC MOVIE THEATRE', -1),
+    ('CITY ELECTRIC CO', -1), ('COMCAST CABLE', -1), ('VERIZON PHONE', -1),
+    ('AMAZON MKTP', -1), ('BEST BUY ELECTRONICS', -1), ('CVS PHARMACY', -1),
+    ('DOCTOR OFFICE COPAY', -1), ('HARDWARE STORE', -1), ('PET SUPPLIES PLUS', -1),
+    ('PAYCHECK DIRECT DEPOSIT', 1), ('TRANSFER FROM SAVINGS', 1), ('REFUND', 1),
+]
+
+CITIES = ['SEATTLE WA', 'AUSTIN TX', 'DENVER CO', 'BOSTON MA', 'CHICAGO IL', 'ONLINE']
+
+# name -> (header, function turning one generated transaction into a CSV row)
+FORMATS = {
+    'generic': (
+        ['Date', 'Description', 'Amount'],
+        lambda d, desc, amt, rng: [d.isoformat(), desc, f'{amt:.2f}'],
+    ),
+    'chase': (
+        ['Details', 'Posting Date', 'Description', 'Amount', 'Type', 'Balance', 'Check or Slip #'],
+        lambda d, desc, amt, rng: ['DEBIT' if amt < 0 else 'CREDIT', d.strftime('%m/%d/%Y'), desc,
+                                   f'{amt:.2f}', 'ACH_DEBIT' if amt < 0 else 'ACH_CREDIT',
+                                   f'{rng.uniform(100, 9000):.2f}', ''],
+    ),
+    'capital_one': (
+        ['Transaction Date', 'Posted Date', 'Card No.', 'Description', 'Category', 'Debit', 'Credit'],
+        lambda d, desc, amt, rng: [d.isoformat(), (d + timedelta(days=1)).isoformat(), '1234', desc,
+                                   'Other', f'{-amt:.2f}' if amt < 0 else '',
+                                   f'{amt:.2f}' if amt > 0 else ''],
+    ),
+    'amex': (
+        ['Date', 'Description', 'Card Member', 'Account #', 'Amount'],
+        # Amex shows charges as positive numbers
+        lambda d, desc, amt, rng: [d.strftime('%m/%d/%Y'), desc, 'J SMITH', '-12345', f'{-amt:.2f}'],
+    ),
+}
+
+
+def generate_csv(path, rows, fmt='generic', seed=0, end_date=None, days=365):
+    """Write a synthetic statement with `rows` transactions over the last `days` days
+
+    The same arguments always produce the same file.
+    """
+    header, to_row = FORMATS[fmt]
+    end_date = end_date or date.today()
+    rng = random.Random(f'{seed}:{fmt}')
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        batch = []
+        for _ in range(rows):
+            merchant, sign = rng.choice(MERCHANTS)
+            description = f'{merchant} #{rng.randint(1, 999):04d} {rng.choice(CITIES)}'
+            if sign > 0:
+                amount = round(rng.uniform(200, 3000), 2)
+            else:
+                amount = -round(rng.expovariate(1 / 45) + 1, 2)
+            day = end_date - timedelta(days=rng.randrange(days))
+            batch.append(to_row(day, description, amount, rng))
+            if len(batch) >= 10000:
+                writer.writerows(batch)
+                batch = []
+        writer.writerows(batch)
+    return path
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def bench_ingest(paths):
+    result = {'rows': 0, 'new': 0, 'skipped': 0, 'rejected': 0, 'seconds': 0.0}
+    for path in paths:
+        start = time.perf_counter()
+        with open(path, 'rb') as f:
+            counts = finance_app.ingest_csv_stream(f)
+        result['seconds'] += time.perf_counter() - start
+        for key in ('new', 'skipped', 'rejected'):
+            result[key] += counts[key]
+    result['rows'] = result['new'] + result['skipped'] + result['rejected']
+    result['rows_per_sec'] = result['rows'] / result['seconds'] if result['seconds'] else 0
+    return result
+
+
+def bench_categorize(samples):
+    descriptions, amounts = zip(*samples)
+    conn = sqlite3.connect(finance_app.DB_PATH)
+    try:
+        finance_app.categorize_transaction(descriptions[0], amounts[0], conn)  # build the matcher
+        start = time.perf_counter()
+        for description, amount in samples:
+            finance_app.categorize_transaction(description, amount, conn)
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        finance_app.categorize_transactions(descriptions, amounts, conn)
+        many = time.perf_counter() - start
+    finally:
+        conn.close()
+    return {
+        'calls': len(samples),
+        'per_sec': len(samples) / single if single else 0,
+        'many_per_sec': len(samples) / many if many else 0,
+    }
+
+
+def bench_endpoints(urls, requests=50, warmup=3):
+    client = finance_app.app.test_client()
+    # Measure the views themselves, not the response cache
+    saved_entries = finance_app.response_cache.max_entries
+    finance_app.response_cache.max_entries = 0
+    results = {}
+    try:
+        for url in urls:
+            for _ in range(warmup):
+                client.get(url)
+            timings = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    raise RuntimeError(f'{url} returned {response.status_code}')
+            results[url] = {
+                'requests': requests,
+                'p50_ms': percentile(timings, 50),
+                'p99_ms': percentile(timings, 99),
+                'mean_ms': sum(timings) / len(timings),
+            }
+    finally:
+        finance_app.response_cache.max_entries = saved_entries
+    return results
+
+
+def run_benchmark(rows, formats=('generic',), seed=0, requests=50, end_date=None, workdir=None):
+    """Generate, ingest and time everything against a scratch database"""
+    end_date = end_date or date.today()
+    workdir = workdir or tempfile.mkdtemp(prefix='finance-bench-')
+    saved_db = finance_app.DB_PATH
+    finance_app.DB_PATH = os.path.join(workdir, 'bench.db')
+    try:
+        finance_app.init_db()
+
+        # Split the rows evenly over the formats, one statement per format
+        start = time.perf_counter()
+        paths = []
+        for i, fmt in enumerate(formats):
+            count = rows // len(formats) + (1 if i < rows % len(formats) else 0)
+            paths.append(generate_csv(os.path.join(workdir, f'{fmt}.csv'), count, fmt,
+                                      seed=seed, end_date=end_date))
+        generate_seconds = time.perf_counter() - start
+
+        ingest = bench_ingest(paths)
+
+        conn = sqlite3.connect(finance_app.DB_PATH)
+        try:
+            samples = conn.execute(
+                'SELECT description, amount FROM transactions ORDER BY id LIMIT 100000').fetchall()
+        finally:
+            conn.close()
+        categorize = bench_categorize(samples)
+
+        endpoints = bench_endpoints(['/', '/transactions', '/api/chart-data'], requests=requests)
+    finally:
+        finance_app.DB_PATH = saved_db
+
+    return {
+        'run_at': datetime.now().isoformat(timespec='seconds'),
+        'config': {'rows': rows, 'formats': list(formats), 'seed': seed,
+                   'requests': requests, 'end_date': end_date.isoformat()},
+        'environment': {'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+                        'platform': platform.platform()},
+        'generate_seconds': generate_seconds,
+        'ingest': ingest,
+        'categorize': categorize,
+        'endpoints': endpoints,
+    }
+
+
+def flatten(results):
+    """{'ingest.rows_per_sec': ..., 'endpoints./.p50_ms': ...} for the numbers we compare"""
+    flat = {
+        'ingest.rows_per_sec': results['ingest']['rows_per_sec'],
+        'categorize.per_sec': results['categorize']['per_sec'],
+        'categorize.many_per_sec': results['categorize']['many_per_sec'],
+    }
+    for url, stats in results['endpoints'].items():
+        for key in ('p50_ms', 'p99_ms'):
+            flat[f'endpoints.{url}.{key}'] = stats[key]
+    return flat
+
+
+def compare(old, new):
+    """Print each metric next to the previous run"""
+    old_flat, new_flat = flatten(old), flatten(new)
+    for name, value in new_flat.items():
+        before = old_flat.get(name)
+        if not before:
+            print(f'{name:40} {value:12.2f}')
+            continue
+        change = (value - before) / before * 100
+        # Latencies should go down, throughput up
+        better = change < 0 if name.endswith('_ms') else change > 0
+        label = 'same' if change == 0 else ('better' if better else 'worse')
+        print(f'{name:40} {before:12.2f} -> {value:12.2f}  ({change:+.1f}%, {label})')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark ingest, categorization and dashboard endpoints')
+    parser.add_argument('--rows', type=int, default=10000, help='transactions to generate (split over formats)')
+    parser.add_argument('--formats', default='generic,chase,capital_one,amex',
+                        help=f"comma separated, any of: {', '.join(FORMATS)}")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--end-date', help='last transaction date, YYYY-MM-DD (default: today)')
+    parser.add_argument('--requests', type=int, default=50, help='timed requests per endpoint')
+    parser.add_argument('--output', default='benchmark_results.json', help='where to write the results')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    parser.add_argument('--keep', action='store_true', help="keep the generated CSVs and database")
+    args = parser.parse_args(argv)
+
+    formats = [f.strip() for f in args.formats.split(',') if f.strip()]
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(unknown)}")
+    end_date = datetime.strptime(args.end_date, '%Y-%m-%d').date() if args.end_date else None
+
+    workdir = tempfile.mkdtemp(prefix='finance-bench-')
+    try:
+        results = run_benchmark(args.rows, formats, seed=args.seed, requests=args.requests,
+                                end_date=end_date, workdir=workdir)
+    finally:
+        if args.keep:
+            print(f'Generated files kept in {workdir}')
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    ingest = results['ingest']
+    print(f"Ingest: {ingest['rows']} rows in {ingest['seconds']:.2f}s "
+          f"({ingest['rows_per_sec']:.0f} rows/sec, {ingest['rejected']} rejected)")
+    print(f"categorize_transaction: {results['categorize']['per_sec']:.0f}/sec "
+          f"(categorize_many: {results['categorize']['many_per_sec']:.0f}/sec)")
+    for url, stats in results['endpoints'].items():
+        print(f"GET {url}: p50 {stats['p50_ms']:.1f}ms, p99 {stats['p99_ms']:.1f}ms")
+    print(f'Results written to {args.output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
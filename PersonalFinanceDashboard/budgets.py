@@ -0,0 +1,121 @@
+"""
+Monthly budgets per category.
+
+budgets holds the monthly limit for each category. monthly_spending holds the
+running expense total per month and category, and triggers on transactions
+keep it current as rows are ingested, recategorized, edited or deleted - so
+checking the current month against the budgets is one read over the budget
+rows, never a SUM over transactions.
+"""
+
+# Same trick as rollups.py - NULL categories become '' so the upsert key works
+ADD_SPENDING_SQL = '''
+    INSERT INTO monthly_spending (month, category, spent)
+    VALUES (substr(NEW.date, 1, 7), COALESCE(NEW.category, ''), -NEW.amount)
+    ON CONFLICT (month, category) DO UPDATE SET spent = spent + excluded.spent;
+'''
+
+REMOVE_SPENDING_SQL = '''
+    UPDATE monthly_spending SET spent = spent + OLD.amount
+    WHERE month = substr(OLD.date, 1, 7) AND category = COALESCE(OLD.category, '');
+'''
+
+# Within this fraction of the limit counts as a warning
+WARNING_THRESHOLD = 0.8
+
+STATUS_SQL = '''
+    SELECT budgets.category, budgets.monthly_limit, COALESCE(monthly_spending.spent, 0) AS spent
+    FROM budgets
+    LEFT JOIN monthly_spending
+        ON monthly_spending.month = ? AND monthly_spending.category = budgets.category
+    ORDER BY budgets.category
+'''
+
+
+def create_budget_tables(conn):
+    """Migration: budget tables, spending triggers and a backfill of existing data"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS budgets (
+            category TEXT PRIMARY KEY,
+            monthly_limit REAL NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS monthly_spending (
+            month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            spent REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, category)
+        ) WITHOUT ROWID
+    ''')
+
+    # Only expenses (negative amounts) count against a budget
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS spending_after_insert
+        AFTER INSERT ON transactions WHEN NEW.amount < 0
+        BEGIN {ADD_SPENDING_SQL} END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS spending_after_delete
+        AFTER DELETE ON transactions WHEN OLD.amount < 0
+        BEGIN {REMOVE_SPENDING_SQL} END
+    ''')
+    # An edit is "take the old row out, put the new one in" - split in two
+    # because either side might not be an expense
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS spending_after_update_old
+        AFTER UPDATE OF date, category, amount ON transactions WHEN OLD.amount < 0
+        BEGIN {REMOVE_SPENDING_SQL} END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS spending_after_update_new
+        AFTER UPDATE OF date, category, amount ON transactions WHEN NEW.amount < 0
+        BEGIN {ADD_SPENDING_SQL} END
+    ''')
+
+    conn.execute('DELETE FROM monthly_spending')
+    conn.execute('''
+        INSERT INTO monthly_spending (month, category, spent)
+        SELECT substr(date, 1, 7), COALESCE(category, ''), -SUM(amount)
+        FROM transactions
+        WHERE amount < 0
+        GROUP BY 1, 2
+    ''')
+
+
+def set_budget(conn, category, monthly_limit):
+    conn.execute('''
+        INSERT INTO budgets (category, monthly_limit) VALUES (?, ?)
+        ON CONFLICT (category) DO UPDATE SET
+            monthly_limit = excluded.monthly_limit,
+            updated_at = CURRENT_TIMESTAMP
+    ''', (category, monthly_limit))
+
+
+def delete_budget(conn, category):
+    """Returns True if there was a budget to delete"""
+    return conn.execute('DELETE FROM budgets WHERE category = ?', (category,)).rowcount > 0
+
+
+def budget_status(conn, month):
+    """Budget vs actual for every budgeted category in month ('YYYY-MM')"""
+    status = []
+    for category, limit, spent in conn.execute(STATUS_SQL, (month,)):
+        spent = round(spent, 2)
+        used = spent / limit if limit else 0
+        if spent > limit:
+            state = 'over'
+        elif used >= WARNING_THRESHOLD:
+            state = 'warning'
+        else:
+            state = 'ok'
+        status.append({
+            'category': category,
+            'limit': limit,
+            'spent': spent,
+            'remaining': round(limit - spent, 2),
+            'percent': round(used * 100, 1),
+            'status': state,
+        })
+    return status
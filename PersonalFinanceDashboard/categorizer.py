@@ -0,0 +1,138 @@
+"""
+Keyword categorizer for the finance dashboard.
+
+categorize_transaction() used to open a connection, re-read the categories
+table and re-split every keyword string for every single row. This compiles
+all the keywords into one regex instead and keeps it around until the
+categories table actually changes (triggers in init_db bump a version number
+in app_meta whenever a category is added, edited or removed).
+"""
+
+import re
+import threading
+
+# Income detection words - same list the old categorize_transaction used
+INCOME_KEYWORDS = ['salary', 'paycheck', 'deposit', 'transfer']
+
+DEFAULT_CATEGORY = 'Other'
+
+
+def get_categories_version(conn):
+    """Current categories version (0 if the meta table isn't there yet)"""
+    try:
+        row = conn.execute(
+            "SELECT value FROM app_meta WHERE key = 'categories_version'"
+        ).fetchone()
+    except Exception:
+        return 0
+    return row[0] if row else 0
+
+
+class Categorizer:
+    """All category keywords compiled into a single matcher.
+
+    Precedence is the same as before: positive amounts with an income word are
+    'Income', otherwise the first category (in table order) with any keyword
+    found in the description wins, and 'Other' if nothing matches.
+    """
+
+    def __init__(self, categories, version=None):
+        self.version = version
+        self._keyword_rank = {}
+        self._always_rank = None  # a category with an empty keyword matches everything
+        self._names = []
+
+        for rank, (name, keywords) in enumerate(categories):
+            self._names.append(name)
+            if not keywords:
+                continue
+            for keyword in keywords.split(','):
+                keyword = keyword.strip()
+                if not keyword:
+                    # '' in description is always True in the old code
+                    if self._always_rank is None:
+                        self._always_rank = rank
+                    continue
+                if keyword not in self._keyword_rank:
+                    self._keyword_rank[keyword] = rank
+
+        # Alternatives are ordered by rank, and the lookahead lets finditer
+        # report a match at every position, so overlapping keywords from a
+        # higher priority category can't get hidden behind a lower one.
+        ordered = sorted(self._keyword_rank, key=lambda k: (self._keyword_rank[k], -len(k)))
+        if ordered:
+            pattern = '(?=(' + '|'.join(re.escape(k) for k in ordered) + '))'
+            self._pattern = re.compile(pattern)
+        else:
+            self._pattern = None
+
+        self._income_pattern = re.compile('|'.join(re.escape(k) for k in INCOME_KEYWORDS))
+
+    @classmethod
+    def from_db(cls, conn):
+        version = get_categories_version(conn)
+        categories = conn.execute('SELECT name, keywords FROM categories').fetchall()
+        return cls(categories, version=version)
+
+    def _rank(self, description_lower):
+        best = self._always_rank
+        if self._pattern is not None:
+            for match in self._pattern.finditer(description_lower):
+                rank = self._keyword_rank[match.group(1)]
+                if best is None or rank < best:
+                    best = rank
+                    if best == 0:
+                        break
+        return best
+
+    def categorize(self, description, amount):
+        """Categorize a single description/amount pair"""
+        description_lower = description.lower()
+        if amount > 0 and self._income_pattern.search(description_lower):
+            return 'Income'
+        rank = self._rank(description_lower)
+        return DEFAULT_CATEGORY if rank is None else self._names[rank]
+
+    def categorize_many(self, descriptions, amounts):
+        """Categorize a whole column in one call.
+
+        Bank statements repeat the same merchants over and over, so each
+        distinct description is only matched once.
+        """
+        ranks = {}
+        results = []
+        for description, amount in zip(descriptions, amounts):
+            description_lower = str(description).lower()
+            if amount > 0 and self._income_pattern.search(description_lower):
+                results.append('Income')
+                continue
+            if description_lower in ranks:
+                rank = ranks[description_lower]
+            else:
+                rank = ranks[description_lower] = self._rank(description_lower)
+            results.append(DEFAULT_CATEGORY if rank is None else self._names[rank])
+        return results
+
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def get_categorizer(conn, db_path=None):
+    """Return the cached categorizer, rebuilding it if categories changed"""
+    version = get_categories_version(conn)
+    current = _cache.get(db_path)
+    # version 0 means no meta table (old db) - can't tell if anything changed
+    if current is not None and version and current.version == version:
+        return current
+    with _lock:
+        current = _cache.get(db_path)
+        if current is None or not version or current.version != version:
+            current = _cache[db_path] = Categorizer.from_db(conn)
+        return current
+
+
+def invalidate(db_path=None):
+    """Drop the cached categorizer so the next call rebuilds it"""
+    with _lock:
+        _cache.pop(db_path, None)
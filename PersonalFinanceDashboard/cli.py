@@ -0,0 +1,20 @@
+"""
+Shared setup for the command-line tools (migrations.py, recategorize.py,
+import_statements.py).
+"""
+
+import logging
+
+
+def open_database(path):
+    """Point the app at path, create/migrate its schema and log to the console
+
+    Returns the app module.
+    """
+    # Imported here - the app imports the tools' modules, so they can't import it at the top
+    import app as finance_app
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    finance_app.DB_PATH = path
+    finance_app.init_db()  # creates missing tables, then runs migrate()
+    return finance_app
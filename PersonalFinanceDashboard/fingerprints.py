@@ -0,0 +1,53 @@
+"""
+Transaction fingerprints, for skipping rows that were already uploaded.
+
+A fingerprint is a hash of date, description, amount, account and an
+occurrence counter, and a unique index on it makes INSERT OR IGNORE skip
+anything that's already in the database. add_fingerprints() is the migration
+that brings older databases up to that: the column, a backfill and the index.
+"""
+
+import hashlib
+
+
+def fingerprint_key(date, description, amount, account):
+    return f"{date}|{description}|{amount:.2f}|{account}"
+
+
+def transaction_fingerprint(date, description, amount, account, occurrence=0):
+    """Stable id for a transaction so re-uploads can be skipped
+
+    occurrence counts genuine repeats within one upload (two identical coffees
+    on the same day are 0 and 1), so they don't collapse into one row.
+    """
+    key = f"{fingerprint_key(date, description, amount, account)}|{occurrence}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def backfill_fingerprints(conn):
+    """Give existing rows fingerprints (repeats numbered in insert order)"""
+    rows = conn.execute('''
+        SELECT id, date, description, amount, account,
+               ROW_NUMBER() OVER (
+                   PARTITION BY date, description, ROUND(amount, 2), account ORDER BY id
+               ) - 1 AS occurrence
+        FROM transactions
+        WHERE fingerprint IS NULL
+    ''').fetchall()
+    conn.executemany(
+        'UPDATE transactions SET fingerprint = ? WHERE id = ?',
+        ((transaction_fingerprint(date, desc, amount, account, occ), row_id)
+         for row_id, date, desc, amount, account, occ in rows))
+
+
+def add_fingerprints(conn):
+    """Migration: fingerprint column (if the table predates it), backfill and unique index"""
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(transactions)')]
+    if 'fingerprint' not in columns:
+        conn.execute('ALTER TABLE transactions ADD COLUMN fingerprint TEXT')
+    backfill_fingerprints(conn)
+    # Re-uploading an overlapping statement hits this index instead of adding duplicates
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_fingerprint
+        ON transactions (fingerprint)
+    ''')
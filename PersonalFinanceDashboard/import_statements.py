@@ -0,0 +1,132 @@
+"""
+Import a bunch of bank statements at once.
+
+At month end there are dozens of account exports to get through. Parsing and
+categorizing is the slow part and it's all CPU, so each file goes to a worker
+process. The workers never touch finance.db - they send their prepared rows
+back here, and this process is the only writer, committing in batches. So more
+cores means more throughput without SQLite lock fights between writers.
+
+Usage:
+    python import_statements.py statements/*.csv
+    python import_statements.py --workers 4 --batch-size 10000 --db finance.db jan/*.csv
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import app as finance_app
+import categorizer
+import cli
+
+# Set up once per worker process by _init_worker
+_worker_matcher = None
+
+
+def _init_worker(categories, version):
+    global _worker_matcher
+    _worker_matcher = categorizer.Categorizer(categories, version=version)
+
+
+def parse_statement(path, account, chunk_rows=50000):
+    """Worker: read one CSV and turn it into transaction rows
+
+    Returns (path, rows, rejects). Runs in a worker process, so it only uses
+    the categorizer snapshot it was started with.
+    """
+    rows = []
+    rejects = []
+    plan = None
+    seen = {}  # repeat counts for the fingerprints, per file like a normal upload
+    for chunk in pd.read_csv(path, chunksize=chunk_rows):
+        if plan is None:
+            plan = finance_app.get_parse_plan(chunk)
+        chunk_rows_out, chunk_rejects = finance_app.build_transaction_rows(
+            chunk, plan, _worker_matcher, seen, account)
+        rows.extend(chunk_rows_out)
+        rejects.extend(chunk_rejects)
+    return path, rows, rejects
+
+
+def import_files(paths, workers=None, batch_size=10000, progress=None, accounts=None):
+    """Parse files in parallel and write them to finance.db from this process
+
+    Each file's transactions go under its own account - accounts[path] if
+    given, otherwise account_for(path). progress(path, result) is called after
+    each file is written, and result is a dict with new/skipped/rejected
+    counts. Returns the overall totals.
+    """
+    accounts = accounts or {}
+    workers = workers or min(len(paths), os.cpu_count() or 1) or 1
+
+    conn = sqlite3.connect(finance_app.DB_PATH)
+    try:
+        # Snapshot the categories once and hand the same matcher to every worker
+        matcher = categorizer.get_categorizer(conn, finance_app.DB_PATH)
+        categories = conn.execute('SELECT name, keywords FROM categories').fetchall()
+
+        totals = {'files': 0, 'new': 0, 'skipped': 0, 'rejected': 0, 'failed': 0}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(categories, matcher.version)) as pool:
+            futures = {}
+            for path in paths:
+                account = accounts.get(path) or finance_app.account_for(path)
+                futures[pool.submit(parse_statement, path, account)] = path
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    _, rows, rejects = future.result()
+                except Exception as e:
+                    totals['failed'] += 1
+                    if progress:
+                        progress(path, {'error': str(e)})
+                    continue
+
+                # Single writer - commit in batches so no transaction gets huge
+                new = 0
+                for start in range(0, len(rows), batch_size):
+                    new += finance_app.write_transaction_rows(conn, rows[start:start + batch_size])
+
+                # Logged here rather than in the workers, so files don't interleave
+                finance_app.log_rejects(rejects, path)
+                result = {'new': new, 'skipped': len(rows) - new, 'rejected': len(rejects)}
+                totals['files'] += 1
+                for key in ('new', 'skipped', 'rejected'):
+                    totals[key] += result[key]
+                if progress:
+                    progress(path, result)
+    finally:
+        conn.close()
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import several bank statement CSVs in parallel')
+    parser.add_argument('files', nargs='+', help='CSV files to import')
+    parser.add_argument('--db', default=finance_app.DB_PATH, help='database file (default: finance.db)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--batch-size', type=int, default=10000, help='rows per commit')
+    args = parser.parse_args(argv)
+
+    cli.open_database(args.db)
+
+    def report(path, result):
+        if 'error' in result:
+            print(f"FAILED {path}: {result['error']}")
+        else:
+            print(f"{path}: {result['new']} new, {result['skipped']} already imported, "
+                  f"{result['rejected']} unreadable rows")
+
+    totals = import_files(args.files, workers=args.workers, batch_size=args.batch_size, progress=report)
+    print(f"Imported {totals['files']} files: {totals['new']} new transactions, "
+          f"{totals['skipped']} already imported, {totals['rejected']} unreadable rows")
+    return 1 if totals['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Versioned schema migrations for finance.db.
+
+init_db() still creates the base tables with CREATE TABLE IF NOT EXISTS, but
+anything that changes an existing database goes in MIGRATIONS below. The
+schema version lives in PRAGMA user_version, each migration runs in its own
+transaction, and a database only ever moves forward - so upgrading an old
+finance.db never touches the data that's already in it.
+
+Also has the query plan check: EXPLAIN QUERY PLAN on every query the routes
+run, failing if any of them falls back to a full table scan.
+
+Usage:
+    python migrations.py [finance.db]           # apply pending migrations
+    python migrations.py [finance.db] --check   # ...then check the query plans
+"""
+
+import logging
+import re
+import sqlite3
+import sys
+
+import budgets
+import cli
+import fingerprints
+
+logger = logging.getLogger('finance.migrations')
+
+# (version, description, statements) - append only, never edit a shipped one
+MIGRATIONS = [
+    (1, 'performance indexes for transactions', [
+        # /transactions and the recent list on the dashboard: ORDER BY date DESC, created_at DESC
+        'CREATE INDEX IF NOT EXISTS idx_transactions_date_created ON transactions (date, created_at)',
+        # /transactions?category=... with or without a date range, same ordering
+        'CREATE INDEX IF NOT EXISTS idx_transactions_category_date ON transactions (category, date, created_at)',
+        # Covering index for date-range aggregates (sum of amounts per category)
+        'CREATE INDEX IF NOT EXISTS idx_transactions_date_category_amount ON transactions (date, category, amount)',
+    ]),
+    (2, 'budgets with trigger-maintained monthly spending', budgets.create_budget_tables),
+    (3, 'transaction fingerprints for skipping re-uploaded rows', fingerprints.add_fingerprints),
+    # Cached dashboard responses go stale on any change to transactions, whatever made it
+    (4, 'bump data_version on every change to transactions', [
+        f'''CREATE TRIGGER IF NOT EXISTS data_version_{event.lower()}
+            AFTER {event} ON transactions
+            BEGIN
+                UPDATE app_meta SET value = value + 1 WHERE key = 'data_version';
+            END'''
+        for event in ('INSERT', 'UPDATE', 'DELETE')
+    ]),
+]
+
+
+def get_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn, migrations=None):
+    """Apply every migration newer than the database's user_version
+
+    Returns the list of versions that were applied.
+    """
+    migrations = MIGRATIONS if migrations is None else migrations
+    if conn.in_transaction:
+        conn.commit()
+
+    applied = []
+    current = get_version(conn)
+    for version, description, statements in sorted(migrations, key=lambda m: m[0]):
+        if version <= current:
+            continue
+        try:
+            conn.execute('BEGIN')
+            if callable(statements):
+                statements(conn)
+            else:
+                for statement in statements:
+                    conn.execute(statement)
+            # user_version is part of the db header, so it commits (or rolls back) with the rest
+            conn.execute(f'PRAGMA user_version = {int(version)}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info("Applied migration %s: %s", version, description)
+        applied.append(version)
+        current = version
+    return applied
+
+
+# "SCAN t" is a full table scan, "SCAN t USING INDEX ..." walks an index in order
+_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+
+# Tables with one row per category - reading all of them is the point
+SMALL_TABLES = {'budgets', 'categories'}
+
+
+def find_table_scans(conn, sql, params=()):
+    """Return the EXPLAIN QUERY PLAN lines that are full table scans"""
+    plan = conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+    scans = []
+    for row in plan:
+        match = _SCAN_RE.match(row[-1])
+        if match and match.group(1) not in SMALL_TABLES:
+            scans.append(row[-1])
+    return scans
+
+
+def check_query_plans(conn, queries):
+    """Run EXPLAIN QUERY PLAN over (name, sql, params) and report table scans
+
+    Returns a list of (name, scan detail) - empty means every query uses an index.
+    """
+    failures = []
+    for name, sql, params in queries:
+        for detail in find_table_scans(conn, sql, params):
+            failures.append((name, detail))
+    return failures
+
+
+def main(argv):
+    args = [a for a in argv if not a.startswith('--')]
+    db_path = args[0] if args else 'finance.db'
+    finance_app = cli.open_database(db_path)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        print(f"{db_path} is at schema version {get_version(conn)}")
+        if '--check' not in argv:
+            return 0
+        failures = check_query_plans(conn, finance_app.route_queries())
+    finally:
+        conn.close()
+
+    if failures:
+        for name, detail in failures:
+            print(f"FAIL {name}: {detail}")
+        return 1
+    print("All route queries use an index")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
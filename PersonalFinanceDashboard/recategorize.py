@@ -0,0 +1,108 @@
+"""
+Re-run the category rules over transactions that are already stored.
+
+Editing keywords in the categories table only affects new uploads, so this
+walks the whole transactions table in id ranges, categorizes each batch with
+the current rules (each distinct description is only matched once) and then
+issues one UPDATE per resulting category for the rows that actually changed.
+Every batch is its own short transaction, so the dashboard can keep reading
+between them instead of waiting for the whole run.
+
+Usage:
+    python recategorize.py --dry-run         # show what would change
+    python recategorize.py --db finance.db   # apply it
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+from collections import Counter, defaultdict
+
+import categorizer
+import cli
+
+# Only the rows that changed get written, grouped by their new category
+UPDATE_SQL = '''
+    UPDATE transactions SET category = ?
+    WHERE id IN (SELECT value FROM json_each(?))
+'''
+
+BATCH_SQL = '''
+    SELECT id, description, amount, category FROM transactions
+    WHERE id > ? AND id <= ?
+'''
+
+
+def recategorize(conn, batch_size=50000, dry_run=False, progress=None):
+    """Re-apply the category rules to every transaction
+
+    Returns {'scanned', 'changed', 'dry_run', 'changes'} where changes is a
+    list of {'from', 'to', 'count'} sorted by count. With dry_run nothing is
+    written. progress(scanned, changed) is called after each batch.
+    """
+    # Fresh matcher straight from the table - this is the "rules changed" case
+    matcher = categorizer.Categorizer.from_db(conn)
+    max_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM transactions').fetchone()[0]
+
+    scanned = 0
+    changed = 0
+    changes = Counter()
+    # id is the rowid, so each range is a b-tree seek rather than an OFFSET scan
+    for start in range(0, max_id, batch_size):
+        rows = conn.execute(BATCH_SQL, (start, start + batch_size)).fetchall()
+        if not rows:
+            continue
+        ids, descriptions, amounts, old_categories = zip(*rows)
+        new_categories = matcher.categorize_many(descriptions, amounts)
+
+        by_category = defaultdict(list)
+        for row_id, old, new in zip(ids, old_categories, new_categories):
+            if old != new:
+                by_category[new].append(row_id)
+                changes[(old, new)] += 1
+
+        batch_changed = sum(len(v) for v in by_category.values())
+        if batch_changed and not dry_run:
+            with conn:
+                for category, row_ids in by_category.items():
+                    conn.execute(UPDATE_SQL, (category, json.dumps(row_ids)))
+
+        scanned += len(rows)
+        changed += batch_changed
+        if progress:
+            progress(scanned, changed)
+
+    return {
+        'scanned': scanned,
+        'changed': changed,
+        'dry_run': dry_run,
+        'changes': [{'from': old, 'to': new, 'count': count}
+                    for (old, new), count in changes.most_common()],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Re-apply category keywords to stored transactions')
+    parser.add_argument('--db', default='finance.db', help='database file (default: finance.db)')
+    parser.add_argument('--dry-run', action='store_true', help="show the changes but don't write them")
+    parser.add_argument('--batch-size', type=int, default=50000, help='rows per batch/commit')
+    args = parser.parse_args(argv)
+
+    cli.open_database(args.db)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        result = recategorize(conn, batch_size=args.batch_size, dry_run=args.dry_run)
+    finally:
+        conn.close()
+
+    for change in result['changes']:
+        print(f"{change['from'] or '(none)'} -> {change['to']}: {change['count']}")
+    verb = 'Would change' if args.dry_run else 'Changed'
+    print(f"{verb} {result['changed']} of {result['scanned']} transactions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Versioned response cache for the dashboard endpoints.
+
+Triggers on transactions bump a data_version counter in app_meta (and the
+categories triggers bump categories_version). Responses are keyed on those versions plus today's
+date - the dashboard windows are relative to date('now') - so a cached page is
+only ever served while it's still exactly what the view would produce.
+
+Every cached response gets an ETag built from that key, so browsers polling
+with If-None-Match get a 304 without the view running at all. On top of that
+there's an optional in-process LRU (size bounded, with a TTL) holding the
+rendered bodies, so other tabs/clients skip the queries too.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request, session
+
+
+def get_data_version(conn):
+    """(data_version, categories_version) - either changing invalidates responses"""
+    rows = dict(conn.execute(
+        "SELECT key, value FROM app_meta WHERE key IN ('data_version', 'categories_version')"
+    ).fetchall())
+    return rows.get('data_version', 0), rows.get('categories_version', 0)
+
+
+def bump_data_version(conn):
+    """Call this (inside the same transaction) for changes the triggers don't see, like budgets"""
+    conn.execute("UPDATE app_meta SET value = value + 1 WHERE key = 'data_version'")
+
+
+class LRUCache:
+    """Small thread-safe LRU with a TTL, max_entries=0 turns it off"""
+
+    def __init__(self, max_entries=128, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if not self.max_entries:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def versioned_response(get_version, cache=None):
+    """Decorator for GET views whose output only depends on the data version
+
+    get_version() returns something hashable that changes whenever the
+    underlying data does.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Pending flash messages get rendered into the page - never cache those
+            if session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            # date('now') in SQLite is UTC, so the day in the key has to be too
+            today = time.strftime('%Y-%m-%d', time.gmtime())
+            key = f"{request.full_path}|{get_version()}|{today}"
+            etag = hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'no-cache'
+                return response
+
+            cached = cache.get(etag) if cache is not None else None
+            if cached is not None:
+                body, status, mimetype = cached
+                response = Response(body, status=status, mimetype=mimetype)
+            else:
+                response = view(*args, **kwargs)
+                response = make_response(response)
+                if response.status_code != 200:
+                    return response
+                if cache is not None:
+                    cache.set(etag, (response.get_data(), response.status_code, response.mimetype))
+
+            response.set_etag(etag)
+            # Browsers may keep it, but have to check the ETag before reusing it
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,133 @@
+"""
+Materialized rollups for the dashboard and chart endpoints.
+
+daily_rollups holds one row per day x category x sign (1 income, -1 expense,
+0 for zero amounts) with the summed amount and the number of transactions.
+Triggers on transactions keep it current on every insert, edit and delete, so
+the dashboard only ever reads a few hundred rollup rows instead of scanning
+the whole transactions table on each page load.
+"""
+
+SIGN_SQL = "CASE WHEN {0}.amount > 0 THEN 1 WHEN {0}.amount < 0 THEN -1 ELSE 0 END"
+
+# NULL categories are stored as '' - NULLs never conflict in a primary key,
+# so the upsert would otherwise add a new row every time
+ADD_SQL = '''
+    INSERT INTO daily_rollups (day, category, sign, total, txn_count)
+    VALUES (NEW.date, COALESCE(NEW.category, ''), {sign}, NEW.amount, 1)
+    ON CONFLICT (day, category, sign) DO UPDATE SET
+        total = total + excluded.total,
+        txn_count = txn_count + 1;
+'''.format(sign=SIGN_SQL.format('NEW'))
+
+REMOVE_SQL = '''
+    UPDATE daily_rollups
+    SET total = total - OLD.amount, txn_count = txn_count - 1
+    WHERE day = OLD.date AND category = COALESCE(OLD.category, '') AND sign = {sign};
+    DELETE FROM daily_rollups
+    WHERE day = OLD.date AND category = COALESCE(OLD.category, '') AND sign = {sign}
+      AND txn_count <= 0;
+'''.format(sign=SIGN_SQL.format('OLD'))
+
+
+def init_rollups(conn):
+    """Create the rollup table and triggers (and fill it for existing data)"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_rollups'"
+    ).fetchone()
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_rollups (
+            day TEXT NOT NULL,
+            category TEXT NOT NULL,
+            sign INTEGER NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            txn_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, category, sign)
+        ) WITHOUT ROWID
+    ''')
+
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS rollups_after_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            {ADD_SQL}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS rollups_after_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            {REMOVE_SQL}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS rollups_after_update
+        AFTER UPDATE OF date, category, amount ON transactions
+        BEGIN
+            {REMOVE_SQL}
+            {ADD_SQL}
+        END
+    ''')
+
+    if not exists:
+        rebuild_rollups(conn)
+
+
+def rebuild_rollups(conn):
+    """Recompute the rollups from scratch (only needed for old databases)"""
+    conn.execute('DELETE FROM daily_rollups')
+    conn.execute(f'''
+        INSERT INTO daily_rollups (day, category, sign, total, txn_count)
+        SELECT date, COALESCE(category, ''), {SIGN_SQL.format('t')}, SUM(amount), COUNT(*)
+        FROM transactions t
+        GROUP BY 1, 2, 3
+    ''')
+
+
+# Read queries - kept as constants so the query plan check can EXPLAIN them too
+SUMMARY_SQL = '''
+    SELECT COALESCE(SUM(CASE WHEN sign = 1 THEN total END), 0),
+           COALESCE(SUM(CASE WHEN sign = -1 THEN total END), 0)
+    FROM daily_rollups
+    WHERE day >= date('now', ?)
+'''
+
+CATEGORY_SPENDING_SQL = '''
+    SELECT NULLIF(r.category, '') AS category, c.color, -SUM(r.total) AS amount
+    FROM daily_rollups r
+    LEFT JOIN categories c ON c.name = r.category
+    WHERE r.sign = -1 AND r.day >= date('now', ?)
+    GROUP BY r.category
+    ORDER BY amount DESC
+'''
+
+MONTHLY_SQL = '''
+    SELECT substr(day, 1, 7) AS month,
+           COALESCE(-SUM(CASE WHEN sign = -1 THEN total END), 0) AS expenses,
+           COALESCE(SUM(CASE WHEN sign = 1 THEN total END), 0) AS income
+    FROM daily_rollups
+    WHERE day >= date('now', ?)
+    GROUP BY month
+    ORDER BY month
+'''
+
+
+def summary_since(conn, since_modifier):
+    """Income and expense totals since date('now', since_modifier)"""
+    income, expenses = conn.execute(SUMMARY_SQL, (since_modifier,)).fetchone()
+    return income, expenses
+
+
+def category_spending_since(conn, since_modifier):
+    """Expense totals per category (with colour) since date('now', since_modifier)"""
+    rows = conn.execute(CATEGORY_SPENDING_SQL, (since_modifier,)).fetchall()
+    return [{'category': category, 'color': color, 'amount': amount}
+            for category, color, amount in rows]
+
+
+def monthly_totals_since(conn, since_modifier):
+    """Income/expenses per month since date('now', since_modifier)"""
+    rows = conn.execute(MONTHLY_SQL, (since_modifier,)).fetchall()
+    return [{'month': month, 'expenses': expenses, 'income': income}
+            for month, expenses, income in rows]
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# The app is a flat set of modules next to app.py, not a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as finance_app
+import bank_profiles
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(finance_app, 'DB_PATH', str(tmp_path / 'finance.db'))
+    finance_app.init_db()
+    bank_profiles.clear_cache()
+    yield finance_app.DB_PATH
+    bank_profiles.clear_cache()
@@ -0,0 +1,27 @@
+import io
+import sqlite3
+
+import app as finance_app
+import bank_profiles
+
+
+def test_headers_differing_only_in_case_share_the_cache(db):
+    first = b'Date,Description,Amount\n2024-01-05,KROGER,-42.10\n2024-01-06,PAYROLL,1500.00\n'
+    second = b'date , description,AMOUNT\n2024-02-05,SHELL OIL,-30.00\n'
+
+    assert finance_app.ingest_csv_stream(io.BytesIO(first))['new'] == 2
+    # Same fingerprint as the first file, so this one comes from the cache
+    assert finance_app.ingest_csv_stream(io.BytesIO(second))['new'] == 1
+
+    conn = sqlite3.connect(db)
+    rows = conn.execute('SELECT date, description, amount FROM transactions ORDER BY date').fetchall()
+    conn.close()
+    assert rows[-1] == ('2024-02-05', 'SHELL OIL', -30.0)
+
+
+def test_cached_plan_uses_the_current_column_names():
+    bank_profiles.clear_cache()
+    plan = bank_profiles.detect_plan(['Date', 'Description', 'Amount'])
+    assert plan.amount_col == 'Amount'
+    plan = bank_profiles.detect_plan(['date', 'description', 'amount'])
+    assert (plan.date_col, plan.desc_col, plan.amount_col) == ('date', 'description', 'amount')
@@ -0,0 +1,35 @@
+import sqlite3
+
+import recategorize
+from response_cache import get_data_version
+
+
+def insert_transaction(conn, category):
+    with conn:
+        conn.execute("INSERT INTO transactions (date, description, amount, category) "
+                     "VALUES ('2024-01-05', 'KROGER #123', -42.10, ?)", (category,))
+
+
+def test_every_kind_of_write_to_transactions_bumps_data_version(db):
+    conn = sqlite3.connect(db)
+    versions = [get_data_version(conn)[0]]
+    insert_transaction(conn, 'Other')
+    versions.append(get_data_version(conn)[0])
+    with conn:
+        conn.execute("UPDATE transactions SET description = 'KROGER #124'")
+    versions.append(get_data_version(conn)[0])
+    with conn:
+        conn.execute('DELETE FROM transactions')
+    versions.append(get_data_version(conn)[0])
+    conn.close()
+    assert versions == sorted(set(versions))
+
+
+def test_recategorize_makes_cached_responses_stale(db):
+    conn = sqlite3.connect(db)
+    insert_transaction(conn, 'Other')
+    before = get_data_version(conn)[0]
+    recategorize.recategorize(conn)
+    assert conn.execute('SELECT category FROM transactions').fetchone() == ('Groceries',)
+    assert get_data_version(conn)[0] > before
+    conn.close()
@@ -0,0 +1,46 @@
+import io
+import logging
+
+import app as finance_app
+import import_statements
+
+BAD_ROWS = (b'Date,Description,Amount\n2024-01-05,KROGER,-42.10\n'
+            + b'not a date,JUNK,-1.00\n' * 500 + b'2024-01-06,PAYROLL,abc\n')
+
+
+def test_unreadable_rows_are_logged_once_not_printed(db, capsys, caplog):
+    with caplog.at_level(logging.WARNING, logger='finance'):
+        result = finance_app.ingest_csv_stream(io.BytesIO(BAD_ROWS))
+    assert result['new'] == 1 and result['rejected'] == 501
+    assert capsys.readouterr().out == ''
+    assert [r.getMessage() for r in caplog.records] == ["upload: skipped 501 rows that couldn't be parsed"]
+
+
+def test_statement_workers_hand_back_their_rejects(db, tmp_path, caplog):
+    path = tmp_path / 'jan.csv'
+    path.write_bytes(BAD_ROWS)
+    with caplog.at_level(logging.DEBUG, logger='finance'):
+        totals = import_statements.import_files([str(path)], workers=1)
+    assert totals['new'] == 1 and totals['rejected'] == 501
+    assert "could not parse amount 'abc'" in caplog.text
+
+
+def test_account_comes_from_the_file_name_without_its_date():
+    assert finance_app.account_for('/tmp/chase-4421_2024-01.csv') == 'chase-4421'
+    assert finance_app.account_for('Amex Gold 20240131.CSV') == 'Amex Gold'
+    assert finance_app.account_for('statement.csv') == 'statement'
+    assert finance_app.account_for('2024-01.csv') == 'Uploaded'
+
+
+def test_same_purchase_on_two_cards_is_kept_on_both(db, tmp_path):
+    purchase = b'Date,Description,Amount\n2024-01-05,AMAZON MKTPL,-25.00\n'
+    paths = []
+    for name in ('visa_2024-01.csv', 'amex_2024-01.csv'):
+        paths.append(str(tmp_path / name))
+        (tmp_path / name).write_bytes(purchase)
+    assert import_statements.import_files(paths, workers=1)['new'] == 2
+
+    # Next month's visa export overlaps January - that row is already in
+    (tmp_path / 'visa_2024-02.csv').write_bytes(purchase + b'2024-02-01,NETFLIX,-15.49\n')
+    totals = import_statements.import_files([str(tmp_path / 'visa_2024-02.csv')], workers=1)
+    assert (totals['new'], totals['skipped']) == (1, 1)
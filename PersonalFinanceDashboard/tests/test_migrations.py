@@ -0,0 +1,36 @@
+import sqlite3
+
+import app as finance_app
+import migrations
+
+
+def test_old_database_gets_fingerprints_and_data_version_triggers(tmp_path, monkeypatch):
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    # transactions as it was before fingerprints, with a genuine repeat
+    conn.execute('''
+        CREATE TABLE transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT NOT NULL, description TEXT NOT NULL,
+            amount REAL NOT NULL, category TEXT, account TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.executemany("INSERT INTO transactions (date, description, amount, account) VALUES (?, ?, ?, 'Uploaded')",
+                     [('2024-01-05', 'COFFEE', -3.5), ('2024-01-05', 'COFFEE', -3.5)])
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(finance_app, 'DB_PATH', path)
+    finance_app.init_db()
+
+    conn = sqlite3.connect(path)
+    assert migrations.get_version(conn) == max(m[0] for m in migrations.MIGRATIONS)
+    fingerprints = [row[0] for row in conn.execute('SELECT fingerprint FROM transactions')]
+    assert len(set(fingerprints)) == 2 and None not in fingerprints
+    triggers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    assert {'data_version_insert', 'data_version_update', 'data_version_delete'} <= triggers
+
+    # Re-uploading the same two coffees adds nothing
+    rows = [(d, desc, amt, None, 'Uploaded', finance_app.transaction_fingerprint(d, desc, amt, 'Uploaded', occ))
+            for occ, (d, desc, amt) in enumerate([('2024-01-05', 'COFFEE', -3.5)] * 2)]
+    assert finance_app.write_transaction_rows(conn, rows) == 0
+    conn.close()